@@ -0,0 +1,107 @@
+import math
+
+import numpy as np
+
+from batch_game import BatchGame
+from simulation_liar import run_games
+from stats import GameStats
+
+
+# two-sided normal quantiles for the usual confidence levels
+z_scores = {0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+def z_score(confidence):
+    z = z_scores.get(confidence)
+    if z is None:
+        from scipy.stats import norm
+        z = norm.ppf(0.5 + confidence / 2.0)
+    return z
+
+
+# Wilson score interval for count successes out of n, returned as
+# (lower, upper); unlike the plain normal interval it stays sensible for
+# places that are almost never or almost always reached
+def wilson_interval(count, n, confidence=0.95):
+    z = z_score(confidence)
+    p = count / float(n)
+    denom = 1.0 + z * z / n
+    center = (p + z * z / (2.0 * n)) / denom
+    half = z * math.sqrt(p * (1.0 - p) / n + z * z / (4.0 * n * n)) / denom
+    return center - half, center + half
+
+
+# half-width of the interval on every place probability of the given
+# players, as an array [player, place]
+def place_half_widths(rankings, players, confidence=0.95):
+    n = rankings.num_games
+    widths = np.zeros((len(players), rankings.num_players))
+    for (i, player) in enumerate(players):
+        for place in xrange(rankings.num_players):
+            (lower, upper) = wilson_interval(rankings.counts[player, place],
+                                             n, confidence)
+            widths[i, place] = (upper - lower) / 2.0
+    return widths
+
+
+# play games batch_size at a time until the interval on every place
+# probability of the given players is narrower than +/- tolerance, or
+# max_trials games have been played
+# returns the GameStats and a precision report: trials played, the
+# half-widths per player, the widest one and whether the tolerance was met
+def run_adaptive(num_players, dice_per_player, personalities, players,
+                 tolerance=0.01, max_trials=100000, batch_size=1000,
+                 confidence=0.95, batched=False, rng=None):
+    # the report needs at least one batch to measure
+    if max_trials < 1 or batch_size < 1:
+        raise ValueError('max_trials and batch_size must be at least 1')
+    stats = GameStats(num_players)
+    while stats.num_games() < max_trials:
+        size = min(batch_size, max_trials - stats.num_games())
+        if batched:
+            batch = BatchGame(size, num_players, dice_per_player,
+                              personalities, rng=rng)
+            stats.add_batch(batch.run())
+        else:
+            run_games(size, num_players, dice_per_player, personalities,
+                      stats=stats, rng=rng)
+
+        widths = place_half_widths(stats.rankings, players, confidence)
+        if widths.max() < tolerance:
+            break
+
+    precision = {'trials': stats.num_games(),
+                 'confidence': confidence,
+                 'half_widths': dict((player, widths[i].tolist())
+                                     for (i, player) in enumerate(players)),
+                 'max_half_width': float(widths.max()),
+                 'converged': bool(widths.max() < tolerance)}
+    return stats, precision
+
+
+# adaptive simulate_one_vs_many: returns the ranking dict of player 0
+# together with the precision report
+def simulate_one_vs_many_adaptive(num_players, dice_per_player,
+                                  personalities, tolerance=0.01,
+                                  max_trials=100000, batch_size=1000,
+                                  confidence=0.95, batched=False, rng=None):
+    (stats, precision) = run_adaptive(num_players, dice_per_player,
+                                      personalities, [0], tolerance,
+                                      max_trials, batch_size, confidence,
+                                      batched, rng)
+    return stats.rankings.ranking_dict(0), precision
+
+
+# adaptive simulate_mixed: returns the ranking dicts of every player
+# together with the precision report
+def simulate_mixed_adaptive(num_players, dice_per_player, personalities,
+                            tolerance=0.01, max_trials=100000,
+                            batch_size=1000, confidence=0.95, batched=False,
+                            rng=None):
+    players = range(num_players)
+    (stats, precision) = run_adaptive(num_players, dice_per_player,
+                                      personalities, players, tolerance,
+                                      max_trials, batch_size, confidence,
+                                      batched, rng)
+    return [stats.rankings.ranking_dict(player) for player in players], \
+        precision
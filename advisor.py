@@ -0,0 +1,351 @@
+#!/usr/local/bin/python
+
+# bid advice over HTTP: what a rational player would do with a hand
+#
+#   python advisor.py --port 8115
+#   curl 'localhost:8115/advise?hand=1,3,3,5,6&total_dice=15&bid=4,3'
+#   curl -d '[{"hand": [2, 2, 6], "total_dice": 9, "bid": null}]' \
+#       localhost:8115/advise
+#   curl localhost:8115/metrics
+#
+# an answer holds call (whether calling beats the best raise), bid (the
+# best raise as [quantity, face_value], null at the highest bid) and the
+# raise_prob and bid_prob they were weighed on, as RunGame.rational_action
+# and policy.rational_decision decide them
+# handler threads queue their queries and one batching thread answers
+# everything queued within batch_window seconds in one vectorized pass
+# over the probability table, remembering answers in an LRU cache
+# a batch that fails, or a query left unanswered for timeout seconds, gets
+# a 503 instead of an answer
+
+import argparse
+import BaseHTTPServer
+import json
+import Queue
+import SocketServer
+import sys
+import threading
+import timeit
+import urlparse
+from collections import OrderedDict
+
+import numpy as np
+
+from bids import bid_rank, num_bids, rank_to_bid
+from policy import hand_key
+from prob_table import get_prob_table
+
+
+# raised to a caller whose query failed or timed out
+class AdvisorError(Exception):
+    pass
+
+
+# one query waiting for the batching thread
+class Query:
+    def __init__(self, hand_count, total_dice, current_bid):
+        self.hand_count = hand_count
+        self.total_dice = total_dice
+        # a rank, -1 for no bid
+        self.current_bid = current_bid
+        self.key = (hand_key(hand_count), total_dice, current_bid)
+        self.start = timeit.default_timer()
+        self.done = threading.Event()
+        self.answer = None
+        # why the query could not be answered, None if it was
+        self.error = None
+
+
+# check a hand (a list of face values), total_dice and bid (a
+# (quantity, face_value) pair or None) and turn them into a Query
+def make_query(hand, total_dice, bid, max_dice):
+    hand = [int(face) for face in hand]
+    total_dice = int(total_dice)
+    if any(face < 1 or face > 6 for face in hand):
+        raise ValueError('face values run from 1 to 6')
+    if not 0 < total_dice <= max_dice:
+        raise ValueError('total_dice must be between 1 and %d' % max_dice)
+    if not 0 < len(hand) <= total_dice:
+        raise ValueError('the hand must hold between 1 and total_dice dice')
+    current_bid = -1
+    if bid is not None:
+        (quantity, face_value) = [int(x) for x in bid]
+        if not (0 < quantity <= total_dice and 0 < face_value <= 6):
+            raise ValueError('no such bid with %d dice' % total_dice)
+        current_bid = bid_rank((quantity, face_value), total_dice)
+    hand_count = np.bincount(hand, minlength=7)[1:].astype(np.int64)
+    return Query(hand_count, total_dice, current_bid)
+
+
+# rational decisions for a batch of states at once, arrays in and out
+# current_bid holds ranks with -1 for no bid; returns (call, bid,
+# raise_prob, bid_prob) with bid -1 and raise_prob 0.0 at the highest bid
+def evaluate(prob_table, hand_counts, total_dice, current_bid):
+    num_other = total_dice - hand_counts.sum(axis=1)
+    rows = np.arange(len(total_dice))
+
+    (quantity, face_value) = rank_to_bid(current_bid, total_dice)
+    required = quantity - hand_counts[rows, face_value - 1]
+    bid_prob = np.where(current_bid < 0, 1.0,
+                        prob_table.bid_probs(num_other, required))
+
+    (bid, raise_prob) = prob_table.best_bids(hand_counts, num_other,
+                                             total_dice, current_bid)
+    # the highest bid can only be called
+    top = current_bid == num_bids(total_dice) - 1
+    bid = np.where(top, -1, bid)
+    raise_prob = np.where(top, 0.0, raise_prob)
+    call = top | (bid_prob < raise_prob)
+    return call, bid, raise_prob, bid_prob
+
+
+# answers queries in micro-batches and keeps the metrics
+class Advisor:
+    def __init__(self, max_dice=30, cache_size=100000, batch_window=0.002,
+                 max_batch=256, rolling_prob=0.333, timeout=5.0):
+        self.prob_table = get_prob_table(rolling_prob, max_dice)
+        self.max_dice = max_dice
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        # seconds a caller waits for its answer
+        self.timeout = timeout
+        self.queue = Queue.Queue()
+        # answers keyed on (hand, total_dice, current_bid), least recently
+        # used first; only the batching thread touches it
+        self.cache = OrderedDict()
+
+        self.started = timeit.default_timer()
+        self.requests = 0
+        self.cache_hits = 0
+        self.batches = 0
+        self.evaluated = 0
+        self.failed_batches = 0
+        self.timeouts = 0
+        # latencies of the most recent queries, for the percentiles
+        self.latencies = []
+        self.max_latencies = 10000
+        self.total_latency = 0.0
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # answer one query, blocking until its batch has been evaluated
+    def advise(self, hand, total_dice, bid=None):
+        return self.advise_many([(hand, total_dice, bid)])[0]
+
+    # answer a list of (hand, total_dice, bid) queries, raises
+    # AdvisorError when any of them fails or is not answered in time
+    def advise_many(self, queries):
+        queries = [make_query(hand, total_dice, bid, self.max_dice)
+                   for (hand, total_dice, bid) in queries]
+        for query in queries:
+            self.queue.put(query)
+        deadline = timeit.default_timer() + self.timeout
+        for query in queries:
+            if not query.done.wait(max(deadline - timeit.default_timer(),
+                                       0)):
+                self.timeouts += 1
+                raise AdvisorError('no answer within %g seconds' %
+                                   self.timeout)
+            if query.error is not None:
+                raise AdvisorError(query.error)
+        return [query.answer for query in queries]
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+        return
+
+    # batching thread: take the first query waiting, gather whatever else
+    # arrives within batch_window and answer them together
+    def run(self):
+        while True:
+            query = self.queue.get()
+            if query is None:
+                return
+            pending = [query]
+            deadline = timeit.default_timer() + self.batch_window
+            while len(pending) < self.max_batch:
+                timeout = deadline - timeit.default_timer()
+                if timeout <= 0:
+                    break
+                try:
+                    query = self.queue.get(timeout=timeout)
+                except Queue.Empty:
+                    break
+                if query is None:
+                    self.answer_safely(pending)
+                    return
+                pending.append(query)
+            self.answer_safely(pending)
+
+    # answer a batch, failing whatever is left of it if that goes wrong so
+    # the callers are released and the thread keeps serving
+    def answer_safely(self, pending):
+        try:
+            self.answer(pending)
+        except Exception as e:
+            self.failed_batches += 1
+            for query in pending:
+                if not query.done.is_set():
+                    query.error = 'advisor failed: %s' % e
+                    query.done.set()
+        return
+
+    def answer(self, pending):
+        answers = {}
+        misses = OrderedDict()
+        for query in pending:
+            answer = self.cache.pop(query.key, None)
+            if answer is None:
+                misses.setdefault(query.key, query)
+            else:
+                self.cache_hits += 1
+                self.cache[query.key] = answers[query.key] = answer
+
+        if misses:
+            queries = list(misses.values())
+            (call, bid, raise_prob, bid_prob) = evaluate(
+                self.prob_table,
+                np.array([q.hand_count for q in queries]),
+                np.array([q.total_dice for q in queries]),
+                np.array([q.current_bid for q in queries]))
+            for (i, query) in enumerate(queries):
+                best = None
+                if bid[i] >= 0:
+                    best = list(rank_to_bid(int(bid[i]), query.total_dice))
+                answers[query.key] = {'call': bool(call[i]), 'bid': best,
+                                      'raise_prob': float(raise_prob[i]),
+                                      'bid_prob': float(bid_prob[i])}
+                self.cache[query.key] = answers[query.key]
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            self.evaluated += len(queries)
+
+        now = timeit.default_timer()
+        for query in pending:
+            query.answer = answers[query.key]
+            latency = now - query.start
+            self.total_latency += latency
+            self.latencies.append(latency)
+            query.done.set()
+        if len(self.latencies) > self.max_latencies:
+            del self.latencies[:-self.max_latencies]
+        self.requests += len(pending)
+        self.batches += 1
+        return
+
+    def metrics(self):
+        uptime = timeit.default_timer() - self.started
+        latencies = np.array(self.latencies)
+        metrics = {'requests': self.requests,
+                   'batches': self.batches,
+                   'evaluated': self.evaluated,
+                   'cache_hits': self.cache_hits,
+                   'failed_batches': self.failed_batches,
+                   'timeouts': self.timeouts,
+                   'cache_size': len(self.cache),
+                   'uptime_s': uptime,
+                   'requests_per_s': self.requests / uptime,
+                   'mean_batch_size': self.requests / float(max(self.batches,
+                                                                1)),
+                   'mean_latency_ms': 1e3 * self.total_latency /
+                   max(self.requests, 1)}
+        if latencies.size:
+            for q in (50, 90, 99):
+                metrics['p%d_latency_ms' % q] = \
+                    1e3 * float(np.percentile(latencies, q))
+        return metrics
+
+
+class AdvisorHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse.urlparse(self.path)
+        if url.path == '/metrics':
+            return self.reply(200, self.server.advisor.metrics())
+        if url.path != '/advise':
+            return self.reply(404, {'error': 'no such path'})
+        params = urlparse.parse_qs(url.query)
+        try:
+            hand = params['hand'][0].split(',')
+            total_dice = params['total_dice'][0]
+            bid = None
+            if 'bid' in params:
+                bid = params['bid'][0].split(',')
+            answer = self.server.advisor.advise(hand, total_dice, bid)
+        except AdvisorError as e:
+            return self.reply(503, {'error': str(e)})
+        except (KeyError, ValueError) as e:
+            return self.reply(400, {'error': str(e)})
+        return self.reply(200, answer)
+
+    # a JSON query object, or a list of them answered as a list
+    def do_POST(self):
+        if urlparse.urlparse(self.path).path != '/advise':
+            return self.reply(404, {'error': 'no such path'})
+        try:
+            length = int(self.headers.get('content-length', 0))
+            body = json.loads(self.rfile.read(length))
+            queries = body if isinstance(body, list) else [body]
+            answers = self.server.advisor.advise_many(
+                [(q['hand'], q['total_dice'], q.get('bid'))
+                 for q in queries])
+        except AdvisorError as e:
+            return self.reply(503, {'error': str(e)})
+        except (KeyError, TypeError, ValueError) as e:
+            return self.reply(400, {'error': str(e)})
+        return self.reply(200, answers if isinstance(body, list)
+                          else answers[0])
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return
+
+    def log_message(self, format, *args):
+        return
+
+
+# one thread per connection, so concurrent queries meet in the batch queue
+class AdvisorServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, advisor):
+        BaseHTTPServer.HTTPServer.__init__(self, address, AdvisorHandler)
+        self.advisor = advisor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Liar\'s dice bid advisor')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8115)
+    parser.add_argument('--max-dice', type=int, default=30)
+    parser.add_argument('--cache-size', type=int, default=100000)
+    parser.add_argument('--batch-window', type=float, default=0.002,
+                        help='seconds to wait for more queries to batch')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='seconds to wait for an answer before a 503')
+    args = parser.parse_args(argv)
+
+    advisor = Advisor(args.max_dice, args.cache_size, args.batch_window,
+                      args.max_batch, timeout=args.timeout)
+    server = AdvisorServer((args.host, args.port), advisor)
+    print('advising on http://%s:%d' % (args.host, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    advisor.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
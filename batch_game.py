@@ -0,0 +1,365 @@
+import numpy as np
+
+from bids import num_bids, rank_to_bid
+from prob_table import get_prob_table
+from stats import GameStats
+from strategies import Observations, builtin_personalities, decide, \
+    resolve_strategies
+
+
+# count how many dice of each face value 1-6 are in the last axis of hands,
+# empty dice slots are stored as 0 and not counted
+def face_counts(hands):
+    faces = np.arange(1, 7)
+    return (hands[..., np.newaxis] == faces).sum(axis=-2)
+
+
+# plays many independent games at once in lockstep
+# the state of every game still in play is one row of a set of arrays
+# (dice counts, hands, current bid, current/previous player), each call to
+# step() plays one turn of every live game and finished games are retired
+# from the arrays; follows the same rules as RunGame
+class BatchGame:
+    # state arrays with one row per live game, compacted as games finish
+    live_fields = ('game_ids', 'player_dice', 'player_hands', 'hand_counts',
+                   'total_dice', 'current_bid',
+                   'current_player', 'previous_player', 'game_over',
+                   'round_counter')
+
+    def __init__(self, n, num_players, dice_per_player, personalities,
+                 rng=None, prob_table=None, chunk_size=65536,
+                 naive_threshold=0.5, bluff_threshold=0.1, strategies=None):
+        # draw from the global numpy generator unless one is passed in
+        if rng is None:
+            rng = np.random
+        self.rng = rng
+
+        # note: here we are rounding 1/3 to the float 0.333
+        self.rolling_prob = 0.333
+        self.n = n
+        self.num_players = num_players
+        self.dice_per_player = dice_per_player
+        self.max_dice = dice_per_player * num_players
+        self.player_types = np.asarray(personalities)
+
+        # same player parameters as RunGame
+        self.naive_threshold = naive_threshold
+        self.bluff_threshold = bluff_threshold
+        # games of the built-in personalities take the fused path in step,
+        # others, or built-in ones overridden in strategies (a dict by
+        # personality), go through the strategy interface
+        self.strategies = None
+        if strategies is not None or \
+                not set(personalities) <= set(builtin_personalities):
+            self.strategies = resolve_strategies(personalities, strategies,
+                                                 naive_threshold,
+                                                 bluff_threshold)
+
+        if prob_table is None:
+            prob_table = get_prob_table(self.rolling_prob, self.max_dice)
+        self.prob_table = prob_table
+        # rational bids are scored this many games at a time to bound memory
+        self.chunk_size = chunk_size
+
+        self.game_ids = np.arange(n)
+        self.player_dice = np.full((n, num_players), dice_per_player,
+                                   dtype=np.int64)
+        # unused dice slots of players who lost dice hold 0
+        self.player_hands = np.zeros((n, num_players, dice_per_player),
+                                     dtype=np.int8)
+        self.hand_counts = np.zeros((n, num_players, 6), dtype=np.int64)
+        self.total_dice = np.full(n, self.max_dice, dtype=np.int64)
+
+        # rank of the current bid (see bids.py), -1 means there is no bid
+        self.current_bid = np.full(n, -1, dtype=np.int64)
+
+        # previous player is -1 where RunGame would hold None
+        self.current_player = np.zeros(n, dtype=np.int64)
+        self.previous_player = np.full(n, -1, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.round_counter = np.zeros(n, dtype=np.int64)
+
+        # per-game results indexed by game id, kept after a game retires
+        # player_ranking lists players in the order they went out, with the
+        # winner last, as the simulate_* drivers build it
+        self.player_ranking = np.zeros((n, num_players), dtype=np.int64)
+        self.num_ranked = np.zeros(n, dtype=np.int64)
+        self.cumul_turns = np.zeros(n, dtype=np.int64)
+        # every round but the last costs a die, so max_dice bounds the rounds
+        self.round_lengths = np.zeros((n, self.max_dice), dtype=np.int64)
+        self.num_rounds = np.zeros(n, dtype=np.int64)
+
+        self.roll_dice(np.arange(n))
+
+    # n games that all start from the same position, player_dice dice for
+    # each player (0 for players who are out) and starting_player to bid
+    @classmethod
+    def from_position(cls, n, player_dice, starting_player, personalities,
+                      rng=None, prob_table=None, naive_threshold=0.5,
+                      bluff_threshold=0.1, strategies=None):
+        batch = cls(n, len(player_dice), max(player_dice), personalities,
+                    rng=rng, prob_table=prob_table,
+                    naive_threshold=naive_threshold,
+                    bluff_threshold=bluff_threshold, strategies=strategies)
+        batch.player_dice[:] = player_dice
+        batch.current_player[:] = starting_player
+        batch.roll_dice(np.arange(n))
+        return batch
+
+    # number of games still in play
+    def num_live(self):
+        return self.game_ids.size
+
+    # reroll the hands of the given live rows
+    def roll_dice(self, rows):
+        dice = self.player_dice[rows]
+        shape = (rows.size, self.num_players, self.dice_per_player)
+        hands = self.rng.randint(1, 7, size=shape).astype(np.int8)
+        hands[np.arange(self.dice_per_player) >= dice[:, :, np.newaxis]] = 0
+
+        self.player_hands[rows] = hands
+        self.hand_counts[rows] = face_counts(hands)
+        self.total_dice[rows] = dice.sum(axis=1)
+        return
+
+    # id of the next player with dice after start, for the given live rows
+    def next_player_ids(self, rows, start):
+        offsets = np.arange(1, self.num_players + 1)
+        candidates = (start[:, np.newaxis] + offsets) % self.num_players
+        has_dice = self.player_dice[rows[:, np.newaxis], candidates] > 0
+        return candidates[np.arange(rows.size), np.argmax(has_dice, axis=1)]
+
+    # probability that the current bid is true from the current player's
+    # perspective, 1.0 where there is no bid
+    def check_bid_probs(self, counts, num_other):
+        (quantity, face) = rank_to_bid(self.current_bid, self.total_dice)
+        freq = counts[np.arange(counts.shape[0]), face - 1]
+        probs = self.prob_table.bid_probs(num_other, quantity - freq)
+        probs[self.current_bid < 0] = 1.0
+        return probs
+
+    # most likely legal raise for the given live rows, scored in chunks
+    def calc_rational_bids(self, rows, counts, num_other):
+        bid = np.zeros(rows.size, dtype=np.int64)
+        prob = np.zeros(rows.size)
+        table = self.prob_table
+        for start in xrange(0, rows.size, self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            r = rows[chunk]
+            (bid[chunk], prob[chunk]) = table.best_bids(
+                counts[r], num_other[r], self.total_dice[r],
+                self.current_bid[r])
+        return bid, prob
+
+    # one uniformly random legal raise per live game, the legal raises
+    # being the contiguous ranks above the current bid
+    def calc_naive_bids(self):
+        first = self.current_bid + 1
+        num_raises = num_bids(self.total_dice) - first
+        pick = self.rng.random_sample(first.size) * num_raises
+        return first + pick.astype(np.int64)
+
+    # resolve a call on the current bid for the given live rows
+    def call_on_bids(self, rows):
+        (quantity, face) = rank_to_bid(self.current_bid[rows],
+                                       self.total_dice[rows])
+
+        # ones are wild, so they count towards every face value
+        totals = self.hand_counts[rows].sum(axis=1)
+        cnt = totals[:, 0] + np.where(
+            face != 1, totals[np.arange(rows.size), face - 1], 0)
+
+        # a true bid costs the caller a die, a false one the bidder
+        caller = self.current_player[rows]
+        loser = np.where(cnt >= quantity, caller, self.previous_player[rows])
+        self.player_dice[rows, loser] -= 1
+
+        out = self.player_dice[rows, loser] == 0
+        out_ids = self.game_ids[rows[out]]
+        self.player_ranking[out_ids, self.num_ranked[out_ids]] = loser[out]
+        self.num_ranked[out_ids] += 1
+
+        # the loser starts the next round unless they are out, in which
+        # case it passes to the player after the caller
+        after_caller = self.next_player_ids(rows, caller)
+        self.current_player[rows] = np.where(out, after_caller, loser)
+        self.previous_player[rows] = -1
+        self.current_bid[rows] = -1
+
+        self.game_over[rows] = (self.player_dice[rows] > 0).sum(axis=1) == 1
+        return
+
+    # play one turn of every live game, then retire the finished ones
+    def step(self):
+        num = self.num_live()
+        rows = np.arange(num)
+        player = self.current_player
+        player_pers = self.player_types[player]
+
+        counts = self.hand_counts[rows, player]
+
+        if self.strategies is None:
+            (call, new_bid) = self.builtin_actions(rows, player_pers, counts)
+        else:
+            obs = Observations(counts, self.total_dice, self.current_bid,
+                               self.player_dice, player, self.prob_table,
+                               self.rng, self.chunk_size)
+            (call, new_bid) = decide(self.strategies, player_pers, obs)
+
+        raise_rows = np.flatnonzero(~call)
+        self.current_bid[raise_rows] = new_bid[raise_rows]
+        self.previous_player[raise_rows] = player[raise_rows]
+        self.current_player[raise_rows] = self.next_player_ids(
+            raise_rows, player[raise_rows])
+
+        call_rows = np.flatnonzero(call)
+        if call_rows.size:
+            self.call_on_bids(call_rows)
+
+        # turn has been decided, add one to counters
+        self.cumul_turns[self.game_ids] += 1
+        self.round_counter += 1
+
+        # only roll once a player loses a die
+        if call_rows.size:
+            ids = self.game_ids[call_rows]
+            self.round_lengths[ids, self.num_rounds[ids]] = \
+                self.round_counter[call_rows]
+            self.num_rounds[ids] += 1
+            self.round_counter[call_rows] = 0
+            self.roll_dice(call_rows)
+
+        self.retire_finished()
+        return
+
+    # (call, bid) of every live game when all players have built-in
+    # personalities, the same actions the strategies module gives but with
+    # the candidates worked out in one pass for every game
+    # it is no faster than decide(); it stays because the strategies draw
+    # their random numbers per personality, which would change seeded runs
+    def builtin_actions(self, rows, player_pers, counts):
+        num = rows.size
+        player = self.current_player
+        num_other = self.total_dice - self.player_dice[rows, player]
+
+        # every candidate action is worked out for all games, then each game
+        # keeps the one its current player's personality picks
+        naive_bid = self.calc_naive_bids()
+        rational_bid = np.zeros(num, dtype=np.int64)
+        rational_prob = np.zeros(num)
+        needs_rational = np.flatnonzero(player_pers != 1)
+        if needs_rational.size:
+            (rational_bid[needs_rational],
+             rational_prob[needs_rational]) = self.calc_rational_bids(
+                needs_rational, counts, num_other)
+        rational_call = self.check_bid_probs(counts, num_other) < rational_prob
+
+        # naive players call with prob naive_threshold, bluffers do the
+        # opposite of the rational action with prob bluff_threshold
+        u = self.rng.random_sample(num)
+        call = np.where(player_pers == 0, rational_call,
+                        np.where(player_pers == 1, u < self.naive_threshold,
+                                 rational_call != (u < self.bluff_threshold)))
+        # the highest bid possible has to be called, no bid cannot be
+        call |= self.current_bid == num_bids(self.total_dice) - 1
+        call &= self.current_bid >= 0
+        return call, np.where(player_pers == 1, naive_bid, rational_bid)
+
+    # record the winner of every finished game and drop it from the batch
+    def retire_finished(self):
+        done = np.flatnonzero(self.game_over)
+        if done.size == 0:
+            return
+        ids = self.game_ids[done]
+        self.player_ranking[ids, self.num_ranked[ids]] = \
+            self.current_player[done]
+        self.num_ranked[ids] += 1
+        self.drop_rows(~self.game_over)
+        return
+
+    # keep only the live rows where keep is True
+    def drop_rows(self, keep):
+        for name in self.live_fields:
+            setattr(self, name, getattr(self, name)[keep])
+        return
+
+    # play every game to the end
+    def run(self):
+        while self.num_live() > 0:
+            self.step()
+        return self
+
+    # place of every player in every game, 0 being the winner
+    def places(self):
+        places = np.zeros((self.n, self.num_players), dtype=np.int64)
+        order = np.arange(self.num_players - 1, -1, -1)
+        places[np.arange(self.n)[:, np.newaxis], self.player_ranking] = order
+        return places
+
+    # average number of turns per round in every game
+    def avg_round_lengths(self):
+        return self.round_lengths.sum(axis=1) / self.num_rounds.astype(float)
+
+
+# play n games batch_size at a time, yielding each finished BatchGame
+def play_batches(n, num_players, dice_per_player, personalities, rng=None,
+                 batch_size=100000, naive_threshold=0.5, bluff_threshold=0.1,
+                 strategies=None):
+    for start in xrange(0, n, batch_size):
+        size = min(batch_size, n - start)
+        batch = BatchGame(size, num_players, dice_per_player, personalities,
+                          rng=rng, naive_threshold=naive_threshold,
+                          bluff_threshold=bluff_threshold,
+                          strategies=strategies)
+        yield batch.run()
+
+
+# play n games in batches, adding each batch to stats as it finishes, the
+# batched counterpart of simulation_liar.run_games
+def run_batches(n, num_players, dice_per_player, personalities, stats=None,
+                rng=None, batch_size=100000, naive_threshold=0.5,
+                bluff_threshold=0.1, strategies=None):
+    if stats is None:
+        stats = GameStats(num_players)
+    for batch in play_batches(n, num_players, dice_per_player, personalities,
+                              rng, batch_size, naive_threshold,
+                              bluff_threshold, strategies):
+        stats.add_batch(batch)
+    return stats
+
+
+#### Batched versions of the simulation drivers ####
+def simulate_game_batched(n, num_players, dice_per_player, personalities,
+                          rng=None, batch_size=100000, naive_threshold=0.5,
+                          bluff_threshold=0.1):
+    stats = run_batches(n, num_players, dice_per_player, personalities,
+                        rng=rng, batch_size=batch_size,
+                        naive_threshold=naive_threshold,
+                        bluff_threshold=bluff_threshold)
+
+    print('Average Total Turn Length: %f' % stats.turns.mean)
+    print('Average Turns Per Round: %f ' % stats.round_lengths.mean)
+    return
+
+
+# ranking distribution of player 0, as simulate_one_vs_many
+def simulate_one_vs_many_batched(n, num_players, dice_per_player,
+                                 personalities, rng=None, batch_size=100000,
+                                 naive_threshold=0.5, bluff_threshold=0.1):
+    stats = run_batches(n, num_players, dice_per_player, personalities,
+                        rng=rng, batch_size=batch_size,
+                        naive_threshold=naive_threshold,
+                        bluff_threshold=bluff_threshold)
+    return stats.rankings.ranking_dict(0)
+
+
+# ranking distributions of every player, as simulate_mixed
+def simulate_mixed_batched(n, num_players, dice_per_player, personalities,
+                           rng=None, batch_size=100000, naive_threshold=0.5,
+                           bluff_threshold=0.1):
+    stats = run_batches(n, num_players, dice_per_player, personalities,
+                        rng=rng, batch_size=batch_size,
+                        naive_threshold=naive_threshold,
+                        bluff_threshold=bluff_threshold)
+    return [stats.rankings.ranking_dict(player)
+            for player in xrange(num_players)]
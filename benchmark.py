@@ -0,0 +1,241 @@
+#!/usr/local/bin/python
+
+# benchmarks for the hot paths of the liar's dice engine
+#
+#   python benchmark.py run --out bench.json
+#   python benchmark.py run --quick --baseline baseline.json
+#   python benchmark.py compare bench.json baseline.json --tolerance 0.1
+#
+# every case is run over a matrix of player counts, dice per player and
+# personality mixes; results are rates (higher is better) saved as JSON,
+# and compare flags every rate that fell more than tolerance below the
+# baseline
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from batch_game import BatchGame
+from simulation_liar import RunGame, play_game
+
+
+# personality mixes by name, as a function of the number of players
+personality_mixes = {
+    'rational': lambda num_players: [0] * num_players,
+    'naive': lambda num_players: [1] * num_players,
+    'mixed': lambda num_players: [i % 3 for i in range(num_players)],
+    'one_vs_many': lambda num_players: [0] + [1] * (num_players - 1),
+}
+
+default_matrix = {'num_players': [3, 6],
+                  'dice_per_player': [3, 5],
+                  'mixes': ['rational', 'naive', 'mixed', 'one_vs_many']}
+quick_matrix = {'num_players': [3, 6],
+                'dice_per_player': [5],
+                'mixes': ['mixed', 'one_vs_many']}
+
+
+# seconds per call of fn, the best of repeat timing loops each made long
+# enough to last at least min_time
+def time_calls(fn, min_time=0.2, repeat=3):
+    number = 1
+    while True:
+        elapsed = time_loop(fn, number)
+        if elapsed >= min_time:
+            break
+        number *= 2
+    for i in range(repeat - 1):
+        elapsed = min(elapsed, time_loop(fn, number))
+    return elapsed / number
+
+
+def time_loop(fn, number):
+    start = timeit.default_timer()
+    for i in xrange(number):
+        fn()
+    return timeit.default_timer() - start
+
+
+# a game one turn in, so there is a bid on the table
+def make_game(num_players, dice_per_player, personalities, seed=0):
+    rng = np.random.RandomState(seed)
+    liars = RunGame(num_players, dice_per_player, personalities, rng=rng)
+    liars.simulate_one_turn()
+    return liars
+
+
+# the parts of a game call_on_bid changes, so it can be called repeatedly
+def snapshot(liars):
+    return (list(liars.player_dice), liars.current_player,
+            liars.previous_player, liars.current_bid,
+            list(liars.player_ranking), liars.game_over, liars.roll_flag)
+
+
+def restore(liars, state):
+    (player_dice, liars.current_player, liars.previous_player,
+     liars.current_bid, player_ranking, liars.game_over,
+     liars.roll_flag) = state
+    liars.player_dice[:] = player_dice
+    liars.player_ranking[:] = player_ranking
+    return
+
+
+# calls per second of each RunGame hot path
+def bench_methods(num_players, dice_per_player, personalities, min_time):
+    liars = make_game(num_players, dice_per_player, personalities)
+    results = {}
+    for name in ('calc_rational_bid', 'check_bid_prob', 'get_possible_bids',
+                 'roll_dice'):
+        per_call = time_calls(getattr(liars, name), min_time)
+        results[name] = {'calls_per_sec': 1.0 / per_call}
+
+    # call_on_bid changes the game, so time it together with restoring the
+    # state and take off the time restoring alone takes
+    state = snapshot(liars)
+
+    def call_and_restore():
+        liars.call_on_bid()
+        restore(liars, state)
+
+    per_call = time_calls(call_and_restore, min_time) - \
+        time_calls(lambda: restore(liars, state), min_time)
+    results['call_on_bid'] = {'calls_per_sec': 1.0 / max(per_call, 1e-9)}
+    return results
+
+
+# games and turns per second of whole games, one RunGame at a time and
+# through the batched engine
+def bench_games(num_players, dice_per_player, personalities, num_games,
+                batch_size):
+    rng = np.random.RandomState(0)
+    turns = 0
+    start = timeit.default_timer()
+    for i in xrange(num_games):
+        turns += play_game(num_players, dice_per_player, personalities,
+                           rng=rng).cumul_turns
+    elapsed = timeit.default_timer() - start
+    results = {'games': {'games_per_sec': num_games / elapsed,
+                         'turns_per_sec': turns / elapsed}}
+
+    start = timeit.default_timer()
+    batch = BatchGame(batch_size, num_players, dice_per_player,
+                      personalities, rng=np.random.RandomState(0)).run()
+    elapsed = timeit.default_timer() - start
+    results['batch_games'] = {
+        'games_per_sec': batch_size / elapsed,
+        'turns_per_sec': batch.cumul_turns.sum() / elapsed}
+    return results
+
+
+# run every case over the matrix, results keyed 'case/p6_d5_mixed'
+def run_benchmarks(matrix, min_time=0.2, num_games=200, batch_size=5000,
+                   verbose=True):
+    results = {}
+    for num_players in matrix['num_players']:
+        for dice_per_player in matrix['dice_per_player']:
+            for mix in matrix['mixes']:
+                personalities = personality_mixes[mix](num_players)
+                config = 'p%d_d%d_%s' % (num_players, dice_per_player, mix)
+                cases = bench_methods(num_players, dice_per_player,
+                                      personalities, min_time)
+                cases.update(bench_games(num_players, dice_per_player,
+                                         personalities, num_games,
+                                         batch_size))
+                for (case, rates) in sorted(cases.items()):
+                    results['%s/%s' % (case, config)] = rates
+                    if verbose:
+                        print(format_rates('%s/%s' % (case, config), rates))
+    return {'meta': {'python': platform.python_version(),
+                     'numpy': np.__version__,
+                     'machine': platform.machine(),
+                     'time': time.strftime('%Y-%m-%d %H:%M:%S')},
+            'results': results}
+
+
+def format_rates(key, rates):
+    return '%-45s %s' % (key, '  '.join(
+        '%s: %.1f' % (metric, rates[metric]) for metric in sorted(rates)))
+
+
+# list every rate that dropped more than tolerance below the baseline
+# as (key, metric, baseline, current)
+def find_regressions(current, baseline, tolerance=0.1):
+    regressions = []
+    for (key, rates) in sorted(current['results'].items()):
+        if key not in baseline['results']:
+            continue
+        for (metric, value) in sorted(rates.items()):
+            base = baseline['results'][key].get(metric)
+            if base is not None and value < base * (1.0 - tolerance):
+                regressions.append((key, metric, base, value))
+    return regressions
+
+
+# print the comparison, return 1 if anything regressed and 0 otherwise
+def report_comparison(current, baseline, tolerance):
+    regressions = find_regressions(current, baseline, tolerance)
+    for (key, rates) in sorted(current['results'].items()):
+        if key not in baseline['results']:
+            continue
+        for (metric, value) in sorted(rates.items()):
+            base = baseline['results'][key].get(metric)
+            if base is None:
+                continue
+            flag = ''
+            if (key, metric, base, value) in regressions:
+                flag = '  REGRESSION'
+            print('%-45s %-14s %12.1f -> %12.1f (%+.1f%%)%s' %
+                  (key, metric, base, value, 100.0 * (value / base - 1.0),
+                   flag))
+    print('%d regression(s) beyond %.0f%%' %
+          (len(regressions), 100 * tolerance))
+    return 1 if regressions else 0
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Liar\'s dice benchmarks')
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', help='run the benchmarks')
+    run.add_argument('--out', default='bench.json')
+    run.add_argument('--quick', action='store_true',
+                     help='smaller matrix and shorter timings')
+    run.add_argument('--baseline', help='compare against this result file')
+    run.add_argument('--tolerance', type=float, default=0.1)
+
+    compare = commands.add_parser('compare',
+                                  help='compare two result files')
+    compare.add_argument('current')
+    compare.add_argument('baseline')
+    compare.add_argument('--tolerance', type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == 'compare':
+        return report_comparison(load_results(args.current),
+                                 load_results(args.baseline), args.tolerance)
+
+    if args.quick:
+        current = run_benchmarks(quick_matrix, min_time=0.05, num_games=50,
+                                 batch_size=1000)
+    else:
+        current = run_benchmarks(default_matrix)
+    with open(args.out, 'w') as f:
+        json.dump(current, f, indent=2, sort_keys=True)
+    if args.baseline:
+        return report_comparison(current, load_results(args.baseline),
+                                 args.tolerance)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
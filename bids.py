@@ -0,0 +1,29 @@
+# bids are encoded as a single integer rank within a round
+# with T dice on the table, the bid of quantity q on face value v has rank
+# (v - 1) * T + (q - 1), so ranks run 0 .. 6T - 1 in the order bids raise
+# each other and the legal raises over rank r are exactly r + 1 .. 6T - 1
+# the helpers work on plain ints as well as numpy arrays
+
+
+# rank of the bid (quantity, face_value)
+def bid_rank(bid, total_dice):
+    (quantity, face_value) = bid
+    return (face_value - 1) * total_dice + quantity - 1
+
+
+# (quantity, face_value) tuple of a bid rank
+def rank_to_bid(rank, total_dice):
+    return (rank % total_dice + 1, rank // total_dice + 1)
+
+
+# number of bids that can be made with total_dice on the table, one more
+# than the rank of the highest bid (total_dice sixes)
+def num_bids(total_dice):
+    return 6 * total_dice
+
+
+# lowest rank that raises current_bid, None meaning there is no bid yet
+def first_raise(current_bid):
+    if current_bid is None:
+        return 0
+    return current_bid + 1
@@ -0,0 +1,138 @@
+import os
+import timeit
+
+import numpy as np
+
+from batch_game import BatchGame
+from json_io import read_json, write_json
+from simulation_liar import play_game
+from stats import GameStats
+
+
+# the generator state of a RandomState as plain JSON values
+def rng_state_to_json(rng):
+    (name, keys, pos, has_gauss, cached_gaussian) = rng.get_state()
+    return [name, keys.tolist(), pos, has_gauss, cached_gaussian]
+
+
+def rng_from_json(state):
+    (name, keys, pos, has_gauss, cached_gaussian) = state
+    rng = np.random.RandomState()
+    rng.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss,
+                   cached_gaussian))
+    return rng
+
+
+# written atomically, so a run killed at any moment leaves either the old
+# checkpoint or the new one behind
+# boundary is the checkpoint of a batched run as it stood before a last
+# partial batch, (trial, rng, stats) like the run itself
+def save_checkpoint(path, config, trial, rng, stats, boundary=None):
+    checkpoint = {'config': config, 'trial': trial,
+                  'rng': rng_state_to_json(rng), 'stats': stats.to_dict()}
+    if boundary is not None:
+        (boundary_trial, boundary_rng, boundary_stats) = boundary
+        checkpoint['boundary'] = {'trial': boundary_trial,
+                                  'rng': boundary_rng,
+                                  'stats': boundary_stats}
+    write_json(path, checkpoint)
+    return
+
+
+# (config, trial, rng, stats) of a checkpoint, or with boundary set of the
+# last batch boundary before it where it has one
+def load_checkpoint(path, boundary=False):
+    checkpoint = read_json(path)
+    if boundary and 'boundary' in checkpoint:
+        checkpoint.update(checkpoint['boundary'])
+    return (checkpoint['config'], checkpoint['trial'],
+            rng_from_json(checkpoint['rng']),
+            GameStats.from_dict(checkpoint['stats']))
+
+
+# play n games from seed, saving a checkpoint to path whenever every
+# seconds have passed since the last one and once at the end
+# with resume set a run picks up from the checkpoint at path, which must
+# be for the same games, and gives the same stats as if it had never been
+# stopped; n may be raised on resume to extend a finished run
+# batched plays batch_size games at a time with BatchGame, checkpointing
+# between batches; a run that ends on a partial batch keeps the batch
+# boundary before it, and extending the run replays that batch in full from
+# there, so the batches always fall where an uninterrupted run puts them
+# policy is an optional policy.PolicyCache for the unbatched games; it plays
+# the same games, so a run may be resumed with or without one
+def run_checkpointed(n, num_players, dice_per_player, personalities, path,
+                     seed=0, every=5.0, resume=True, batched=False,
+                     batch_size=10000, naive_threshold=0.5,
+                     bluff_threshold=0.1, report_every=0, policy=None):
+    if batched and policy is not None:
+        raise ValueError('the batch engine does not use a policy table')
+    config = {'num_players': num_players,
+              'dice_per_player': dice_per_player,
+              'personalities': list(personalities), 'seed': seed,
+              'batched': batched, 'batch_size': batch_size,
+              'naive_threshold': naive_threshold,
+              'bluff_threshold': bluff_threshold}
+
+    if resume and os.path.exists(path):
+        (saved_config, trial, rng, stats) = load_checkpoint(path)
+        if saved_config != config:
+            raise ValueError('%s is a checkpoint of another run' % path)
+        # a finished run keeps its checkpoint as it is
+        if trial >= n:
+            return stats
+        (saved_config, trial, rng, stats) = load_checkpoint(path, True)
+    else:
+        (trial, rng, stats) = (0, np.random.RandomState(seed),
+                               GameStats(num_players))
+
+    boundary = None
+    last_save = timeit.default_timer()
+    while trial < n:
+        if batched:
+            size = min(batch_size, n - trial)
+            if size < batch_size:
+                boundary = (trial, rng_state_to_json(rng), stats.to_dict())
+            batch = BatchGame(size, num_players, dice_per_player,
+                              personalities, rng=rng,
+                              naive_threshold=naive_threshold,
+                              bluff_threshold=bluff_threshold)
+            stats.add_batch(batch.run())
+            trial += size
+        else:
+            liars = play_game(num_players, dice_per_player, personalities,
+                              rng, naive_threshold, bluff_threshold,
+                              policy=policy)
+            stats.add_game(liars)
+            trial += 1
+            if report_every > 0 and trial % report_every == 0:
+                print(stats.summary())
+
+        if timeit.default_timer() - last_save >= every:
+            save_checkpoint(path, config, trial, rng, stats, boundary)
+            last_save = timeit.default_timer()
+
+    save_checkpoint(path, config, trial, rng, stats, boundary)
+    return stats
+
+
+#### Checkpointed versions of the simulation drivers ####
+def simulate_one_vs_many_checkpointed(n, num_players, dice_per_player,
+                                      personalities, path, seed=0, every=5.0,
+                                      resume=True, batched=False,
+                                      report_every=0, policy=None):
+    stats = run_checkpointed(n, num_players, dice_per_player, personalities,
+                             path, seed, every, resume, batched,
+                             report_every=report_every, policy=policy)
+    return stats.rankings.ranking_dict(0)
+
+
+def simulate_mixed_checkpointed(n, num_players, dice_per_player,
+                                personalities, path, seed=0, every=5.0,
+                                resume=True, batched=False, report_every=0,
+                                policy=None):
+    stats = run_checkpointed(n, num_players, dice_per_player, personalities,
+                             path, seed, every, resume, batched,
+                             report_every=report_every, policy=policy)
+    return [stats.rankings.ranking_dict(player)
+            for player in xrange(num_players)]
@@ -0,0 +1,206 @@
+#!/usr/local/bin/python
+
+# command line entry point for the liar's dice experiments
+#
+#   python cli.py mixed --trials 100 --personalities 0,1,2
+#   python cli.py one-vs-many --trials 1000 --personalities 0,1,1,1,1,1
+#   python cli.py game --trials 100 --personalities 0,0,1,1,2,2
+#   python cli.py plot --trials 1000 --out 1rational5naive.png
+#   python cli.py all
+#   python cli.py mixed --trials 1000000 --checkpoint mixed.ckpt
+#   python cli.py policy --out policy15 --max-dice 15
+#   python cli.py mixed --trials 100000 --policy policy15
+#
+# personalities are 0 for rational, 1 for naive and 2 for bluffing players,
+# one per player; matplotlib is only imported by the plot commands
+# with --checkpoint, mixed and one-vs-many save their progress every
+# --checkpoint-every seconds and a rerun of the same command resumes it
+# --policy looks the rational decisions up in a table saved by the policy
+# command, which plays the same games faster
+
+import argparse
+import sys
+
+import numpy as np
+
+from checkpoint import simulate_mixed_checkpointed, \
+    simulate_one_vs_many_checkpointed
+from policy import PolicyTable, get_policy
+from prob_table import get_prob_table
+from simulation_liar import simulate_game, simulate_mixed, \
+    simulate_one_vs_many
+
+
+# a game needs two players to ever end
+def parse_personalities(text):
+    try:
+        personalities = [int(p) for p in text.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('%r is not a comma separated list '
+                                         'of personalities' % text)
+    if len(personalities) < 2:
+        raise argparse.ArgumentTypeError('a game needs at least 2 players')
+    return personalities
+
+
+# place probabilities of one ranking dict
+def place_percents(ranking_dict, n):
+    return [ranking_dict[place] / float(n) for place in sorted(ranking_dict)]
+
+
+def run_mixed(n, dice_per_player, personalities, report_every=0,
+              checkpoint=None, checkpoint_every=5.0, seed=0, policy=None):
+    if checkpoint is None:
+        ranking_dicts = simulate_mixed(n, len(personalities),
+                                       dice_per_player, personalities,
+                                       report_every=report_every,
+                                       policy=policy)
+    else:
+        ranking_dicts = simulate_mixed_checkpointed(
+            n, len(personalities), dice_per_player, personalities,
+            checkpoint, seed, checkpoint_every, report_every=report_every,
+            policy=policy)
+    print('\nMixed Trial: One of Each')
+    print('Gambling Personalities')
+    print(personalities)
+    for (i, ranking_dict) in enumerate(ranking_dicts):
+        print('Player: %d' % i)
+        print(place_percents(ranking_dict, n))
+    print('\n\n')
+    return
+
+
+def run_one_vs_many(n, dice_per_player, personalities, report_every=0,
+                    checkpoint=None, checkpoint_every=5.0, seed=0,
+                    policy=None):
+    print('One Vs. Many Trial Simulation\n')
+    if checkpoint is None:
+        rank_distr = simulate_one_vs_many(n, len(personalities),
+                                          dice_per_player, personalities,
+                                          report_every=report_every,
+                                          policy=policy)
+    else:
+        rank_distr = simulate_one_vs_many_checkpointed(
+            n, len(personalities), dice_per_player, personalities,
+            checkpoint, seed, checkpoint_every, report_every=report_every,
+            policy=policy)
+    print('Place Count Frequencies')
+    print([rank_distr[place] for place in sorted(rank_distr)])
+    print('Place Probabilities')
+    print(place_percents(rank_distr, n))
+    return place_percents(rank_distr, n)
+
+
+# bar chart of the place probabilities of player 0, saved to out
+def plot_places(percents, n, out, title, show=False):
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.patches as mpatches
+    import matplotlib.pyplot as plt
+
+    places = [i + 1 for i in xrange(len(percents))]
+    plt.bar(places, percents, width=1, color='purple')
+    plt.xlabel('Ranking Position', fontsize=20)
+    plt.ylabel('Probability', fontsize=20)
+    plt.title(title, y=1.03, fontsize=20)
+    purple_patch = mpatches.Patch(color='purple', label='n = %d' % n)
+    plt.legend(handles=[purple_patch])
+    plt.savefig(out)
+    if show:
+        plt.show()
+    return
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Liar\'s dice experiments')
+    commands = parser.add_subparsers(dest='command')
+
+    defaults = {'mixed': '0,1,2', 'one-vs-many': '0,1,1,1,1,1',
+                'game': '0,1,1,1,1,1', 'plot': '0,1,1,1,1,1',
+                'all': None}
+    helps = {'mixed': 'place probabilities of every player',
+             'one-vs-many': 'place probabilities of player 0',
+             'game': 'average turns per game and per round',
+             'plot': 'one-vs-many with a bar chart of the places',
+             'all': 'mixed and one-vs-many trials with the plot'}
+    for name in ('mixed', 'one-vs-many', 'game', 'plot', 'all'):
+        command = commands.add_parser(name, help=helps[name])
+        command.add_argument('--trials', type=int, default=100)
+        command.add_argument('--dice', type=int, default=5,
+                             help='dice per player')
+        if defaults[name] is not None:
+            command.add_argument('--personalities', type=parse_personalities,
+                                 default=parse_personalities(defaults[name]))
+        command.add_argument('--seed', type=int,
+                             help='seed the random numbers')
+        command.add_argument('--report-every', type=int, default=0,
+                             help='print running stats every this many '
+                                  'games')
+        command.add_argument('--policy',
+                             help='policy table saved by the policy command '
+                                  'to look rational decisions up in')
+        if name in ('mixed', 'one-vs-many'):
+            command.add_argument('--checkpoint',
+                                 help='save progress to this file and '
+                                      'resume from it')
+            command.add_argument('--checkpoint-every', type=float,
+                                 default=5.0, help='seconds between saves')
+        if name in ('plot', 'all'):
+            command.add_argument('--out', default='1rational5naive.png')
+            command.add_argument('--title', default='Probability Distr. 1 '
+                                 'Rational vs. 5 Naive Players')
+            command.add_argument('--show', action='store_true',
+                                 help='also open the plot in a window')
+
+    policy_cmd = commands.add_parser('policy', help='build and save a table '
+                                     'of rational decisions')
+    policy_cmd.add_argument('--out', required=True,
+                            help='directory to save the table to')
+    policy_cmd.add_argument('--max-dice', type=int, default=15,
+                            help='most dice on the table it covers')
+    policy_cmd.add_argument('--max-hand', type=int, default=5,
+                            help='most dice in a hand it covers')
+
+    args = parser.parse_args(argv)
+    if args.command == 'policy':
+        table = PolicyTable.build(get_prob_table(0.333, args.max_dice),
+                                  args.max_dice, args.max_hand)
+        table.save(args.out)
+        return 0
+
+    if args.seed is not None:
+        np.random.seed(args.seed)
+    policy = None
+    if args.policy is not None:
+        policy = get_policy(args.policy)
+
+    if args.command == 'mixed':
+        run_mixed(args.trials, args.dice, args.personalities,
+                  args.report_every, args.checkpoint, args.checkpoint_every,
+                  args.seed or 0, policy)
+    elif args.command == 'one-vs-many':
+        run_one_vs_many(args.trials, args.dice, args.personalities,
+                        args.report_every, args.checkpoint,
+                        args.checkpoint_every, args.seed or 0, policy)
+    elif args.command == 'game':
+        simulate_game(args.trials, len(args.personalities), args.dice,
+                      args.personalities, report_every=args.report_every,
+                      policy=policy)
+    elif args.command == 'plot':
+        percents = run_one_vs_many(args.trials, args.dice,
+                                   args.personalities, args.report_every,
+                                   policy=policy)
+        plot_places(percents, args.trials, args.out, args.title, args.show)
+    else:
+        run_mixed(args.trials, args.dice, [0, 1, 2], args.report_every,
+                  policy=policy)
+        percents = run_one_vs_many(args.trials, args.dice,
+                                   [0, 1, 1, 1, 1, 1], args.report_every,
+                                   policy=policy)
+        plot_places(percents, args.trials, args.out, args.title, args.show)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+
+from simulation_liar import play_game
+
+
+# random numbers for one game: the hand of player p on roll r is the first
+# num_dice dice of dice[r, p], so every configuration playing the game sees
+# the same dice on the same roll whatever the other players hold, and each
+# player draws coin flips and naive bids from a stream of their own, so a
+# player's decisions don't shift when another player's change
+# a fresh DiceStream with the same seed replays the same numbers
+class DiceStream:
+    def __init__(self, seed, num_players, dice_per_player):
+        seed = list(seed)
+        rng = np.random.RandomState(seed + [0])
+        # every round but the last costs a die, so there are at most
+        # num_players * dice_per_player rolls including the first
+        max_rolls = num_players * dice_per_player
+        self.dice = rng.randint(1, 7, size=(max_rolls, num_players,
+                                            dice_per_player))
+        self.player_rngs = [np.random.RandomState(seed + [1, player])
+                            for player in xrange(num_players)]
+
+    def roll(self, roll_index, player, num_dice):
+        return self.dice[roll_index, player, :num_dice]
+
+    def decision_rng(self, player):
+        return self.player_rngs[player]
+
+
+# paired comparison of personality mixes with common random numbers
+# game i of every mix is played with the same DiceStream seed, so the noise
+# mostly cancels in the difference between mixes
+# returns, for the tracked player, the place probabilities of every mix,
+# and for every mix after the first its difference to the first mix with
+# the paired standard error and, for reference, the standard error the
+# same difference would have from independent runs
+def compare_mixes(n, dice_per_player, mixes, player=0, seed=0,
+                  naive_threshold=0.5, bluff_threshold=0.1):
+    num_players = len(mixes[0])
+    num_mixes = len(mixes)
+    # place indicators summed over games, and summed squares of the
+    # differences to the first mix
+    place_sums = np.zeros((num_mixes, num_players), dtype=np.int64)
+    diff_sums = np.zeros((num_mixes, num_players), dtype=np.int64)
+    diff_squares = np.zeros((num_mixes, num_players), dtype=np.int64)
+
+    for i in xrange(n):
+        places = np.zeros((num_mixes, num_players), dtype=np.int64)
+        for (m, personalities) in enumerate(mixes):
+            dice = DiceStream([seed, i], num_players, dice_per_player)
+            liars = play_game(num_players, dice_per_player, personalities,
+                              naive_threshold=naive_threshold,
+                              bluff_threshold=bluff_threshold,
+                              dice_source=dice)
+            ranking = liars.player_ranking
+            place = num_players - 1 - ranking.index(player)
+            places[m, place] = 1
+        place_sums += places
+        diff = places - places[0]
+        diff_sums += diff
+        diff_squares += diff * diff
+
+    probs = place_sums / float(n)
+    results = []
+    for m in xrange(num_mixes):
+        result = {'personalities': list(mixes[m]),
+                  'place_probs': probs[m].tolist()}
+        if m > 0:
+            mean = diff_sums[m] / float(n)
+            var = (diff_squares[m] / float(n) - mean * mean) * n / (n - 1.0)
+            # variance of a place indicator is p(1 - p)
+            independent = (probs[m] * (1 - probs[m]) +
+                           probs[0] * (1 - probs[0])) / (n - 1.0)
+            result['diff'] = mean.tolist()
+            result['std_error'] = [math.sqrt(max(v, 0.0) / n) for v in var]
+            result['independent_std_error'] = [math.sqrt(v)
+                                               for v in independent]
+        results.append(result)
+    return results
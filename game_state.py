@@ -0,0 +1,328 @@
+import numpy as np
+
+from bids import first_raise, num_bids, rank_to_bid
+from policy import rational_decision
+from prob_table import get_prob_table
+from stats import RunningStats
+
+
+# scalar fields of a GameState, in the order they are packed in a snapshot
+scalar_fields = ('num_players', 'dice_per_player', 'total_dice',
+                 'current_player', 'previous_player', 'current_bid',
+                 'cumul_turns', 'round_counter', 'num_rolls', 'num_ranked',
+                 'game_over', 'num_rounds')
+# the mean and sum of squared differences of the round lengths so far, as
+# RunningStats keeps them, packed after the scalars as float64
+round_fields = ('round_mean', 'round_m2')
+faces = np.arange(1, 7, dtype=np.int8)
+
+
+# compact state of one game, for holding many in-flight or branched games
+# in memory: all dice live in one flat int8 buffer where player i owns the
+# slots [i * dice_per_player, (i + 1) * dice_per_player), the first
+# player_dice[i] of them in play and the rest zero, and rerolls write into
+# that buffer in place
+# previous_player and current_bid are -1 where a RunGame holds None, and
+# ranking lists the players in the order they went out, -1 past num_ranked
+# play_turn plays a state on by itself, with the rules and random draws of
+# RunGame, so a population of states never needs a RunGame
+class GameState(object):
+    __slots__ = scalar_fields + round_fields + ('dice', 'player_dice',
+                                                'ranking')
+
+    def __init__(self, num_players, dice_per_player):
+        self.num_players = num_players
+        self.dice_per_player = dice_per_player
+        self.total_dice = num_players * dice_per_player
+        self.current_player = 0
+        self.previous_player = -1
+        self.current_bid = -1
+        self.cumul_turns = 0
+        self.round_counter = 0
+        self.num_rolls = 0
+        self.num_ranked = 0
+        self.game_over = 0
+        self.num_rounds = 0
+        self.round_mean = 0.0
+        self.round_m2 = 0.0
+        self.dice = np.zeros(num_players * dice_per_player, dtype=np.int8)
+        self.player_dice = np.full(num_players, dice_per_player, dtype=np.int8)
+        self.ranking = np.full(num_players, -1, dtype=np.int8)
+
+    # the dice player i has in play, a view into the buffer
+    def hand(self, i):
+        start = i * self.dice_per_player
+        return self.dice[start:start + self.player_dice[i]]
+
+    # reroll every hand in place with one draw for the whole table, which
+    # gives the dice RunGame.roll_dice draws player by player from the same
+    # seeded rng
+    def roll(self, rng=None):
+        if rng is None:
+            rng = np.random
+        in_play = np.arange(self.dice_per_player) < \
+            self.player_dice[:, np.newaxis]
+        self.dice[in_play.ravel()] = rng.randint(1, 7, self.total_dice)
+        self.num_rolls += 1
+        return
+
+    # player loses a die, and goes out with their last one
+    def lose_die(self, player):
+        self.player_dice[player] -= 1
+        self.dice[player * self.dice_per_player + self.player_dice[player]] = 0
+        self.total_dice -= 1
+        if self.player_dice[player] == 0:
+            self.ranking[self.num_ranked] = player
+            self.num_ranked += 1
+            if self.num_ranked == self.num_players - 1:
+                self.game_over = 1
+        return
+
+    # the players in the order they went out, with the winner last once the
+    # game is over, as play_game leaves a RunGame's player_ranking
+    def final_ranking(self):
+        ranking = [int(p) for p in self.ranking[:self.num_ranked]]
+        if self.game_over:
+            ranking.append(self.current_player)
+        return ranking
+
+    # hand_counts[i] holds how many of each face value 1-6 player i has
+    def hand_counts(self):
+        hands = self.dice.reshape(self.num_players, self.dice_per_player)
+        return (hands[:, :, np.newaxis] == faces).sum(axis=1)
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        for name in scalar_fields + round_fields:
+            setattr(state, name, getattr(self, name))
+        state.dice = self.dice.copy()
+        state.player_dice = self.player_dice.copy()
+        state.ranking = self.ranking.copy()
+        return state
+
+    # the whole state as one string of bytes: the scalars as int64, the
+    # round stats as float64, then the dice buffer, the dice counts and the
+    # ranking as int8
+    def snapshot(self):
+        header = np.array([getattr(self, name) for name in scalar_fields],
+                          dtype=np.int64)
+        rounds = np.array([getattr(self, name) for name in round_fields],
+                          dtype=np.float64)
+        return header.tobytes() + rounds.tobytes() + self.dice.tobytes() + \
+            self.player_dice.tobytes() + self.ranking.tobytes()
+
+    @classmethod
+    def from_snapshot(cls, data):
+        state = cls.__new__(cls)
+        state.restore(data)
+        return state
+
+    # overwrite this state with a snapshot
+    def restore(self, data):
+        size = 8 * len(scalar_fields)
+        header = np.frombuffer(data[:size], dtype=np.int64)
+        for (name, value) in zip(scalar_fields, header):
+            setattr(self, name, int(value))
+        rounds = np.frombuffer(data[size:size + 8 * len(round_fields)],
+                               dtype=np.float64)
+        for (name, value) in zip(round_fields, rounds):
+            setattr(self, name, float(value))
+        size += 8 * len(round_fields)
+        body = np.frombuffer(data[size:], dtype=np.int8)
+        num_dice = self.num_players * self.dice_per_player
+        self.dice = body[:num_dice].copy()
+        self.player_dice = body[num_dice:num_dice + self.num_players].copy()
+        self.ranking = body[num_dice + self.num_players:].copy()
+        return
+
+    # slotted objects need these to pickle under protocols 0 and 1
+    def __getstate__(self):
+        return self.snapshot()
+
+    def __setstate__(self, data):
+        self.restore(data)
+        return
+
+    # state of a RunGame, which must be between turns
+    @classmethod
+    def from_game(cls, liars):
+        state = cls(liars.num_players, liars.dice_per_player)
+        for i in xrange(liars.num_players):
+            state.player_dice[i] = liars.player_dice[i]
+            if liars.player_dice[i] > 0:
+                state.hand(i)[:] = liars.player_hands[i]
+        state.total_dice = liars.total_dice
+        state.current_player = liars.current_player
+        if liars.previous_player is not None:
+            state.previous_player = liars.previous_player
+        if liars.current_bid is not None:
+            state.current_bid = liars.current_bid
+        state.cumul_turns = liars.cumul_turns
+        state.round_counter = liars.round_counter
+        state.num_rolls = liars.num_rolls
+        state.num_ranked = len(liars.player_ranking)
+        state.ranking[:state.num_ranked] = liars.player_ranking
+        state.game_over = liars.game_over
+        state.num_rounds = liars.round_stats.count
+        state.round_mean = liars.round_stats.mean
+        state.round_m2 = liars.round_stats.m2
+        return state
+
+    # put this state into a RunGame so it can be played on from here
+    def load_into(self, liars):
+        liars.player_hands = [self.hand(i).astype(np.int64)
+                              for i in xrange(self.num_players)]
+        liars.player_dice = [int(d) for d in self.player_dice]
+        liars.total_dice = self.total_dice
+        liars.current_player = self.current_player
+        liars.previous_player = None
+        if self.previous_player >= 0:
+            liars.previous_player = self.previous_player
+        liars.current_bid = None
+        if self.current_bid >= 0:
+            liars.current_bid = self.current_bid
+        liars.cumul_turns = self.cumul_turns
+        liars.round_counter = self.round_counter
+        liars.num_rolls = self.num_rolls
+        liars.player_ranking = [int(p) for p in self.ranking[:self.num_ranked]]
+        liars.game_over = self.game_over
+        liars.round_stats = self.round_stats()
+        liars.roll_flag = 0
+        liars.count_faces()
+        return
+
+    # the round lengths as a RunningStats
+    def round_stats(self):
+        return RunningStats.from_dict({'count': self.num_rounds,
+                                       'mean': self.round_mean,
+                                       'm2': self.round_m2})
+
+    #### Playing a state on ####
+    # the methods below follow RunGame.simulate_one_turn and the methods it
+    # calls, drawing from rng in the same order, so a state rolled from a
+    # seeded rng and played to the end gives the game RunGame gives
+
+    # play one turn, personalities as given to RunGame; returns 1 once the
+    # game is over and 0 otherwise
+    def play_turn(self, personalities, prob_table=None, rng=None,
+                  naive_threshold=0.5, bluff_threshold=0.1):
+        if self.game_over == 1:
+            return 1
+        if rng is None:
+            rng = np.random
+        if prob_table is None:
+            prob_table = get_prob_table(0.333, self.num_players *
+                                        self.dice_per_player)
+        called = self.decide_action(personalities[self.current_player],
+                                    prob_table, rng, naive_threshold,
+                                    bluff_threshold)
+        self.cumul_turns += 1
+        self.round_counter += 1
+        # a call ends the round, the dice are rolled again and the round
+        # length added as RunningStats.add does
+        if called:
+            self.roll(rng)
+            self.num_rounds += 1
+            delta = self.round_counter - self.round_mean
+            self.round_mean += delta / float(self.num_rounds)
+            self.round_m2 += delta * (self.round_counter - self.round_mean)
+            self.round_counter = 0
+        return 0
+
+    # play turns until the game is over
+    def play(self, personalities, prob_table=None, rng=None,
+             naive_threshold=0.5, bluff_threshold=0.1):
+        while self.play_turn(personalities, prob_table, rng,
+                             naive_threshold, bluff_threshold) == 0:
+            pass
+        return self
+
+    # the current player's move, returns whether they called
+    def decide_action(self, player_pers, prob_table, rng, naive_threshold,
+                      bluff_threshold):
+        # no bid yet, so a bid has to be made
+        if self.previous_player < 0 or self.current_bid < 0:
+            if player_pers == 1:
+                self.make_new_bid(self.naive_bid(rng))
+            else:
+                self.make_new_bid(self.rational_action(prob_table)[1])
+            return False
+        # the highest bid is total_dice sixes and has to be called
+        if self.current_bid == num_bids(self.total_dice) - 1:
+            call = True
+        elif player_pers == 0:
+            (call, bid) = self.rational_action(prob_table)
+        elif player_pers == 1:
+            call = rng.random_sample() < naive_threshold
+            if not call:
+                bid = self.naive_bid(rng)
+        else:
+            (call, bid) = self.rational_action(prob_table)
+            # goes against the rational action with prob bluff_threshold
+            if rng.random_sample() < bluff_threshold:
+                call = not call
+        if call:
+            self.call_on_bid()
+        else:
+            self.make_new_bid(bid)
+        return call
+
+    # (call, bid) the rational player would make, decided by
+    # policy.rational_decision as the advisor and policy tables do
+    def rational_action(self, prob_table):
+        player = self.current_player
+        hand_count = np.bincount(self.hand(player), minlength=7)[1:]
+        current_bid = None if self.current_bid < 0 else self.current_bid
+        (call, bid, _, _) = rational_decision(prob_table, hand_count,
+                                              self.total_dice, current_bid)
+        return call, bid
+
+    # a raise drawn uniformly at random
+    def naive_bid(self, rng):
+        current_bid = None if self.current_bid < 0 else self.current_bid
+        first = first_raise(current_bid)
+        return first + rng.randint(num_bids(self.total_dice) - first)
+
+    def make_new_bid(self, bid):
+        self.current_bid = bid
+        self.previous_player = self.current_player
+        self.next_player_id()
+        return
+
+    # the caller loses a die if the bid holds, the bidder otherwise; the
+    # loser starts the next round unless they went out
+    def call_on_bid(self):
+        (quantity, face_value) = rank_to_bid(self.current_bid,
+                                             self.total_dice)
+        # ones are wild, dice out of play are zero and never match
+        matching = np.count_nonzero(self.dice == face_value)
+        if face_value != 1:
+            matching += np.count_nonzero(self.dice == 1)
+        loser = self.current_player if matching >= quantity else \
+            self.previous_player
+        self.lose_die(loser)
+        self.current_bid = -1
+        self.previous_player = -1
+        if self.player_dice[loser] > 0:
+            self.current_player = loser
+        else:
+            self.next_player_id()
+        return
+
+    def next_player_id(self):
+        next_id = (self.current_player + 1) % self.num_players
+        while self.player_dice[next_id] < 1:
+            next_id = (next_id + 1) % self.num_players
+        self.current_player = next_id
+        return
+
+
+# play a game with a GameState from the start, returns the finished state
+def play_state(num_players, dice_per_player, personalities, rng=None,
+               naive_threshold=0.5, bluff_threshold=0.1, prob_table=None):
+    if rng is None:
+        rng = np.random
+    state = GameState(num_players, dice_per_player)
+    state.roll(rng)
+    return state.play(personalities, prob_table, rng, naive_threshold,
+                      bluff_threshold)
@@ -0,0 +1,158 @@
+import json
+import sys
+import timeit
+
+from bids import rank_to_bid
+
+
+personality_names = {0: 'rational', 1: 'naive', 2: 'bluffing'}
+
+
+# call counts and total time per phase of the turn loop
+class Profiler:
+    def __init__(self):
+        self.counts = {}
+        self.times = {}
+
+    def add(self, name, elapsed):
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+        return
+
+    # wrap fn so every call is counted and timed under name
+    def timed(self, name, fn):
+        def wrapper(*args):
+            start = timeit.default_timer()
+            result = fn(*args)
+            self.add(name, timeit.default_timer() - start)
+            return result
+        return wrapper
+
+    def merge(self, other):
+        for name in other.counts:
+            self.counts[name] = self.counts.get(name, 0) + other.counts[name]
+            self.times[name] = self.times.get(name, 0.0) + other.times[name]
+        return
+
+    # one line per phase, slowest first
+    def report(self, out=None):
+        if out is None:
+            out = sys.stdout
+        out.write('%-28s %10s %12s %12s\n' %
+                  ('phase', 'calls', 'total s', 'per call us'))
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            count = self.counts[name]
+            out.write('%-28s %10d %12.4f %12.2f\n' %
+                      (name, count, self.times[name],
+                       1e6 * self.times[name] / count))
+        return
+
+
+#### Event sinks ####
+# a sink is any object with an emit(event) method, events are dicts with
+#   turn, player, personality, action ('bid' or 'call'), bid as
+#   (quantity, face_value), total_dice, raise_prob and bid_prob (the
+#   probabilities the player looked at, None when not computed) and for
+#   calls bid_true, whether the called bid held
+
+# keeps every event in memory
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+# writes one JSON object per line
+class JsonLinesSink:
+    def __init__(self, f):
+        self.f = f
+
+    def emit(self, event):
+        self.f.write(json.dumps(event) + '\n')
+
+
+# prints a readable line per turn
+class PrintSink:
+    def emit(self, event):
+        print('turn %(turn)d: player %(player)d (%(personality)s) '
+              '%(action)s %(bid)s' % event)
+
+
+# hook a profiler and/or an event sink into one RunGame
+# the hooks replace the game's own methods on the instance, so a game
+# that is not instrumented runs exactly the code it always did and pays
+# nothing for the option
+def instrument(liars, profiler=None, sink=None):
+    if profiler is None and sink is None:
+        return liars
+
+    # what the current turn looked at, filled in by the wrappers below
+    turn = {}
+
+    calc_rational_bid = liars.calc_rational_bid
+    check_bid_prob = liars.check_bid_prob
+    call_on_bid = liars.call_on_bid
+    decide_action = liars.decide_action
+    if profiler is not None:
+        calc_rational_bid = profiler.timed('calc_rational_bid',
+                                           calc_rational_bid)
+        check_bid_prob = profiler.timed('check_bid_prob', check_bid_prob)
+        call_on_bid = profiler.timed('call_on_bid', call_on_bid)
+        liars.roll_dice = profiler.timed('roll_dice', liars.roll_dice)
+
+    def traced_calc_rational_bid():
+        (bid, prob) = calc_rational_bid()
+        turn['raise_prob'] = float(prob)
+        return bid, prob
+
+    def traced_check_bid_prob():
+        prob = check_bid_prob()
+        turn['bid_prob'] = float(prob)
+        return prob
+
+    def traced_call_on_bid():
+        (quantity, face_value) = rank_to_bid(liars.current_bid,
+                                             liars.total_dice)
+        turn['bid_true'] = bool(liars.matching_dice[face_value - 1] >=
+                                quantity)
+        call_on_bid()
+
+    def traced_decide_action(player_pers):
+        player = liars.current_player
+        total_dice = liars.total_dice
+        called_bid = liars.current_bid
+        turn.clear()
+
+        start = timeit.default_timer()
+        decide_action(player_pers)
+        elapsed = timeit.default_timer() - start
+
+        name = personality_names.get(player_pers, str(player_pers))
+        if profiler is not None:
+            profiler.add('decide_action.' + name, elapsed)
+        if sink is None:
+            return
+
+        event = {'turn': liars.cumul_turns,
+                 'player': player,
+                 'personality': name,
+                 'total_dice': total_dice,
+                 'raise_prob': turn.get('raise_prob'),
+                 'bid_prob': turn.get('bid_prob')}
+        if 'bid_true' in turn:
+            event['action'] = 'call'
+            event['bid'] = rank_to_bid(called_bid, total_dice)
+            event['bid_true'] = turn['bid_true']
+        else:
+            event['action'] = 'bid'
+            event['bid'] = rank_to_bid(liars.current_bid, total_dice)
+        sink.emit(event)
+        return
+
+    liars.calc_rational_bid = traced_calc_rational_bid
+    liars.check_bid_prob = traced_check_bid_prob
+    liars.call_on_bid = traced_call_on_bid
+    liars.decide_action = traced_decide_action
+    return liars
@@ -0,0 +1,23 @@
+import json
+import os
+import socket
+
+
+# write data as JSON to a temporary file, flush it to disk and rename it
+# over path, so whoever reads path, or a run killed at any moment, sees
+# either the old file or the new one and never half of one
+# the temporary name is unique to the host and process, so processes
+# writing the same path on a shared directory never write into each other
+def write_json(path, data):
+    tmp_path = '%s.%s.%d.tmp' % (path, socket.gethostname(), os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.rename(tmp_path, path)
+    return
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,199 @@
+import json
+
+import numpy as np
+
+from batch_game import BatchGame
+from stats import GameStats
+
+
+# what can happen in one round from a given position, estimated from
+# simulated rounds: each distinct (loser, next starting player, round
+# length) outcome with its probability
+class RoundOutcomes:
+    def __init__(self, outcomes, counts):
+        # outcomes is an array of (loser, next_player, length) rows
+        self.outcomes = np.asarray(outcomes, dtype=np.int64).reshape(-1, 3)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.probs = self.counts / float(self.counts.sum())
+        self.cumprobs = np.cumsum(self.probs)
+
+    # draw one (loser, next_player, length) outcome
+    def sample(self, rng):
+        i = np.searchsorted(self.cumprobs, rng.random_sample(), side='right')
+        (loser, next_player, length) = self.outcomes[min(i, len(self.probs) - 1)]
+        return int(loser), int(next_player), int(length)
+
+    # {(loser, next_player): probability}, round lengths summed out
+    def transition_probs(self):
+        probs = {}
+        for (row, prob) in zip(self.outcomes, self.probs):
+            key = (int(row[0]), int(row[1]))
+            probs[key] = probs.get(key, 0.0) + prob
+        return probs
+
+    def mean_length(self):
+        return float((self.outcomes[:, 2] * self.probs).sum())
+
+
+# round-level model of a game: a position is the dice count of every
+# player and who bids first, and a round moves it to a position with one
+# die less; the round transitions of a position are estimated from
+# rounds_per_position simulated rounds the first time they are needed and
+# cached, keyed by (dice counts, starting player) for these personalities
+class RoundModel:
+    def __init__(self, personalities, rounds_per_position=2000, rng=None,
+                 naive_threshold=0.5, bluff_threshold=0.1):
+        if rng is None:
+            rng = np.random
+        self.rng = rng
+        self.personalities = list(personalities)
+        self.num_players = len(personalities)
+        self.rounds_per_position = rounds_per_position
+        self.naive_threshold = naive_threshold
+        self.bluff_threshold = bluff_threshold
+        self.transitions = {}
+
+    # outcomes of a round from a position, estimated on first use
+    def outcomes(self, player_dice, starting_player):
+        key = (tuple(player_dice), starting_player)
+        outcomes = self.transitions.get(key)
+        if outcomes is None:
+            outcomes = self.estimate(player_dice, starting_player)
+            self.transitions[key] = outcomes
+        return outcomes
+
+    # play rounds_per_position rounds from a position in lockstep and
+    # tally who lost a die, who starts next and how long each round was
+    def estimate(self, player_dice, starting_player):
+        n = self.rounds_per_position
+        start = np.array(player_dice)
+        batch = BatchGame.from_position(n, player_dice, starting_player,
+                                        self.personalities, rng=self.rng,
+                                        naive_threshold=self.naive_threshold,
+                                        bluff_threshold=self.bluff_threshold)
+        loser = np.full(n, -1, dtype=np.int64)
+        next_player = np.full(n, -1, dtype=np.int64)
+
+        while batch.num_live() > 0:
+            batch.step()
+            # rounds that ended without ending the game are taken out of
+            # the batch before they play on into a second round
+            done = batch.num_rounds[batch.game_ids] > 0
+            if done.any():
+                ids = batch.game_ids[done]
+                lost = start - batch.player_dice[done]
+                loser[ids] = np.argmax(lost, axis=1)
+                next_player[ids] = batch.current_player[done]
+                batch.drop_rows(~done)
+
+        # the rest ended the game, the first player ranked lost the round
+        # and the winner would start the next one
+        over = loser < 0
+        loser[over] = batch.player_ranking[over, 0]
+        next_player[over] = batch.player_ranking[over, 1]
+
+        rows = np.column_stack((loser, next_player, batch.round_lengths[:, 0]))
+        (outcomes, counts) = unique_rows(rows)
+        return RoundOutcomes(outcomes, counts)
+
+    # play n whole games round by round from the start position with every
+    # player holding dice_per_player dice and player 0 bidding first
+    def simulate_games(self, n, dice_per_player, stats=None, rng=None):
+        if rng is None:
+            rng = self.rng
+        if stats is None:
+            stats = GameStats(self.num_players)
+        for i in xrange(n):
+            player_dice = [dice_per_player] * self.num_players
+            starting_player = 0
+            player_ranking = []
+            cumul_turns = 0
+            num_rounds = 0
+            while len(player_ranking) < self.num_players - 1:
+                (loser, starting_player, length) = self.outcomes(
+                    player_dice, starting_player).sample(rng)
+                player_dice[loser] -= 1
+                if player_dice[loser] == 0:
+                    player_ranking.append(loser)
+                cumul_turns += length
+                num_rounds += 1
+            player_ranking.append(starting_player)
+            stats.add_result(player_ranking, cumul_turns,
+                             cumul_turns / float(num_rounds))
+        return stats
+
+    # solve the game as an absorbing Markov chain from the start position
+    # total dice drop by one every round, so positions are visited in order
+    # of decreasing total and the probability of reaching each one can be
+    # pushed forward exactly; returns place_probs[player, place] (0 being
+    # the winner), the expected number of turns and of rounds
+    def solve(self, dice_per_player):
+        start = (tuple([dice_per_player] * self.num_players), 0)
+        reach = {start: 1.0}
+        place_probs = np.zeros((self.num_players, self.num_players))
+        expected_turns = 0.0
+        expected_rounds = 0.0
+
+        for total in xrange(dice_per_player * self.num_players, 0, -1):
+            positions = [key for key in reach if sum(key[0]) == total]
+            for key in sorted(positions):
+                mass = reach.pop(key)
+                (player_dice, starting_player) = key
+                players_left = sum(1 for d in player_dice if d > 0)
+                if players_left == 1:
+                    place_probs[starting_player, 0] += mass
+                    continue
+
+                outcomes = self.outcomes(player_dice, starting_player)
+                expected_turns += mass * outcomes.mean_length()
+                expected_rounds += mass
+                for ((loser, next_player), prob) in \
+                        outcomes.transition_probs().items():
+                    next_dice = list(player_dice)
+                    next_dice[loser] -= 1
+                    if next_dice[loser] == 0:
+                        place_probs[loser, players_left - 1] += mass * prob
+                    next_key = (tuple(next_dice), next_player)
+                    reach[next_key] = reach.get(next_key, 0.0) + mass * prob
+        return place_probs, expected_turns, expected_rounds
+
+    # save the estimated transitions as JSON
+    def save(self, path):
+        entries = []
+        for ((player_dice, starting_player), outcomes) in \
+                self.transitions.items():
+            entries.append({'player_dice': list(player_dice),
+                            'starting_player': starting_player,
+                            'outcomes': outcomes.outcomes.tolist(),
+                            'counts': outcomes.counts.tolist()})
+        with open(path, 'w') as f:
+            json.dump({'personalities': self.personalities,
+                       'naive_threshold': self.naive_threshold,
+                       'bluff_threshold': self.bluff_threshold,
+                       'rounds_per_position': self.rounds_per_position,
+                       'transitions': entries}, f)
+        return
+
+    # load transitions saved for the same personalities and thresholds
+    def load(self, path):
+        with open(path) as f:
+            saved = json.load(f)
+        if (saved['personalities'] != self.personalities or
+                saved['naive_threshold'] != self.naive_threshold or
+                saved['bluff_threshold'] != self.bluff_threshold):
+            raise ValueError('%s holds transitions for another set of '
+                             'players' % path)
+        for entry in saved['transitions']:
+            key = (tuple(entry['player_dice']), entry['starting_player'])
+            self.transitions[key] = RoundOutcomes(entry['outcomes'],
+                                                  entry['counts'])
+        return
+
+
+# distinct rows of a 2-d integer array and how often each occurs
+def unique_rows(rows):
+    counts = {}
+    for row in map(tuple, rows.tolist()):
+        counts[row] = counts.get(row, 0) + 1
+    keys = sorted(counts)
+    return keys, [counts[key] for key in keys]
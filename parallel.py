@@ -0,0 +1,137 @@
+import multiprocessing
+
+import numpy as np
+
+from batch_game import BatchGame
+from policy import get_policy
+from result_store import batch_records, empty_records, record_game
+from simulation_liar import play_game
+from stats import GameStats
+
+
+# generator for one chunk of a run, seeded from the master seed and the
+# chunk index so every chunk gets its own reproducible stream
+def chunk_rng(seed, chunk_index):
+    return np.random.RandomState([seed, chunk_index])
+
+
+# play one chunk of trials, run in the worker processes
+# returns its GameStats, and with record set (stats, records), the records
+# of its games as result_store.empty_records lays them out, for the process
+# that holds the store to add
+# policy is the path of a saved policy.PolicyTable or None, a path rather
+# than the table so every worker loads and memory-maps it once
+def run_chunk(task, record=False):
+    (seed, chunk_index, size, num_players, dice_per_player, personalities,
+     batched, naive_threshold, bluff_threshold, policy) = task
+    rng = chunk_rng(seed, chunk_index)
+    stats = GameStats(num_players)
+    if policy is not None:
+        policy = get_policy(policy)
+
+    records = None
+    if batched:
+        batch = BatchGame(size, num_players, dice_per_player, personalities,
+                          rng=rng, naive_threshold=naive_threshold,
+                          bluff_threshold=bluff_threshold)
+        stats.add_batch(batch.run())
+        if record:
+            records = batch_records(batch)
+    else:
+        if record:
+            records = empty_records(size, num_players)
+        for i in xrange(size):
+            liars = play_game(num_players, dice_per_player, personalities,
+                              rng, naive_threshold, bluff_threshold,
+                              policy=policy)
+            stats.add_game(liars)
+            if record:
+                record_game(records, i, liars)
+    if record:
+        return stats, records
+    return stats
+
+
+# run_chunk with its records, for the pool to map over
+def run_chunk_records(task):
+    return run_chunk(task, record=True)
+
+
+# split n trials into chunks of chunk_size and play them on a pool of
+# workers; the chunking and the per-chunk seeds only depend on seed and
+# chunk_size, and the chunk stats merge in chunk order, so the result is
+# the same for any number of workers
+# with a sink (a ResultStore) the workers hand back the games of every
+# chunk and they are recorded to it under seed and the chunk index, in chunk
+# order
+# policy is the path of a saved policy.PolicyTable to look the rational
+# decisions up in; it plays the same games, only faster, and the batch
+# engine has its own vectorised decisions so it takes none
+def run_trials(n, num_players, dice_per_player, personalities, seed=0,
+               workers=None, chunk_size=1000, batched=False,
+               naive_threshold=0.5, bluff_threshold=0.1, sink=None,
+               policy=None):
+    if batched and policy is not None:
+        raise ValueError('the batch engine does not use a policy table')
+    tasks = []
+    for (chunk_index, start) in enumerate(xrange(0, n, chunk_size)):
+        size = min(chunk_size, n - start)
+        tasks.append((seed, chunk_index, size, num_players, dice_per_player,
+                      personalities, batched, naive_threshold,
+                      bluff_threshold, policy))
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    play = run_chunk if sink is None else run_chunk_records
+
+    if workers == 1:
+        results = (play(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        # imap hands chunks back in order, so they merge in a fixed order
+        results = pool.imap(play, tasks)
+
+    stats = GameStats(num_players)
+    try:
+        for (chunk_index, result) in enumerate(results):
+            if sink is None:
+                chunk_stats = result
+            else:
+                (chunk_stats, records) = result
+                sink.add_records(records, seed=seed, chunk=chunk_index)
+            stats.merge(chunk_stats)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return stats
+
+
+#### Parallel versions of the simulation drivers ####
+def simulate_game_parallel(n, num_players, dice_per_player, personalities,
+                           seed=0, workers=None, chunk_size=1000,
+                           batched=False, policy=None):
+    stats = run_trials(n, num_players, dice_per_player, personalities, seed,
+                       workers, chunk_size, batched, policy=policy)
+    print('Average Total Turn Length: %f' % stats.turns.mean)
+    print('Average Turns Per Round: %f ' % stats.round_lengths.mean)
+    return stats
+
+
+def simulate_one_vs_many_parallel(n, num_players, dice_per_player,
+                                  personalities, seed=0, workers=None,
+                                  chunk_size=1000, batched=False,
+                                  policy=None):
+    stats = run_trials(n, num_players, dice_per_player, personalities, seed,
+                       workers, chunk_size, batched, policy=policy)
+    return stats.rankings.ranking_dict(0)
+
+
+def simulate_mixed_parallel(n, num_players, dice_per_player, personalities,
+                            seed=0, workers=None, chunk_size=1000,
+                            batched=False, policy=None):
+    stats = run_trials(n, num_players, dice_per_player, personalities, seed,
+                       workers, chunk_size, batched, policy=policy)
+    return [stats.rankings.ranking_dict(player)
+            for player in xrange(num_players)]
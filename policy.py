@@ -0,0 +1,192 @@
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from bids import num_bids, rank_to_bid
+from prob_table import get_prob_table
+
+
+# the rational decision for a player holding hand_count (dice per face
+# value 1-6) with total_dice on the table and current_bid (a rank, or None)
+# returns (call, bid, raise_prob, bid_prob): whether the rational move is to
+# call, the most likely raise and its probability (None and 0.0 when the
+# current bid cannot be raised) and the probability of the current bid
+def rational_decision(prob_table, hand_count, total_dice, current_bid):
+    num_other = total_dice - int(np.sum(hand_count))
+
+    if current_bid is None:
+        bid_prob = 1.0
+    else:
+        (quantity, face_value) = rank_to_bid(current_bid, total_dice)
+        bid_prob = prob_table.bid_prob(num_other,
+                                       quantity - hand_count[face_value - 1])
+        # the highest bid can only be called
+        if current_bid == num_bids(total_dice) - 1:
+            return True, None, 0.0, bid_prob
+
+    (bid, raise_prob) = prob_table.best_bid(hand_count, num_other,
+                                            total_dice, current_bid)
+    return bid_prob < raise_prob, bid, raise_prob, bid_prob
+
+
+# hashable key of a 6-face histogram, cheaper to build than a tuple
+def hand_key(hand_count):
+    return np.asarray(hand_count, dtype=np.int64).tobytes()
+
+
+# every hand of 1..max_hand dice as a 6-face histogram, in a fixed order
+def enumerate_hands(max_hand):
+    hands = []
+    for size in xrange(1, max_hand + 1):
+        hands.extend(compositions(size, 6))
+    return hands
+
+
+# all ways of splitting total into parts non-negative counts
+def compositions(total, parts):
+    if parts == 1:
+        return [(total,)]
+    result = []
+    for first in xrange(total, -1, -1):
+        for rest in compositions(total - first, parts - 1):
+            result.append((first,) + rest)
+    return result
+
+
+# the rational decision for every hand of up to max_hand dice, every total
+# of up to max_dice dice and every current bid, held as arrays indexed
+# [hand, total_dice, current_bid + 1] so it can be saved and memory-mapped
+# entries for impossible states (a hand larger than the table) hold -1
+class PolicyTable:
+    def __init__(self, hands, best_bid, raise_prob, bid_prob):
+        self.hands = hands
+        # keyed on the bytes of the hand as an int64 array, see hand_key
+        self.hand_index = dict((hand_key(hand), i)
+                               for (i, hand) in enumerate(hands))
+        self.best_bid = best_bid
+        self.raise_prob = raise_prob
+        self.bid_prob = bid_prob
+        self.max_dice = best_bid.shape[1] - 1
+
+    @classmethod
+    def build(cls, prob_table, max_dice, max_hand=5):
+        hands = enumerate_hands(max_hand)
+        counts = np.array(hands, dtype=np.int64)
+        hand_sizes = counts.sum(axis=1)
+        shape = (len(hands), max_dice + 1, num_bids(max_dice) + 1)
+        best_bid = np.full(shape, -1, dtype=np.int16)
+        raise_prob = np.full(shape, -1.0)
+        bid_prob = np.full(shape, -1.0)
+
+        for total_dice in xrange(1, max_dice + 1):
+            fits = np.flatnonzero(hand_sizes <= total_dice)
+            hand_counts = counts[fits]
+            num_other = total_dice - hand_sizes[fits]
+            last = num_bids(total_dice)
+
+            # probability of every bid, indexed by rank as in best_bid
+            ranks = np.arange(last)
+            (quantity, face_value) = rank_to_bid(ranks, total_dice)
+            required = quantity[np.newaxis, :] - hand_counts[:, face_value - 1]
+            probs = prob_table.bid_probs(num_other[:, np.newaxis], required)
+
+            # walk down the ranks keeping the most likely bid at or above
+            # each one, ties going to the lower rank as in best_bid
+            best_from = np.zeros((fits.size, last), dtype=np.int64)
+            best_from[:, last - 1] = last - 1
+            fit_rows = np.arange(fits.size)
+            for rank in xrange(last - 2, -1, -1):
+                above = best_from[:, rank + 1]
+                better = probs[:, rank] >= probs[fit_rows, above]
+                best_from[:, rank] = np.where(better, rank, above)
+
+            # column 0 is no bid, column rank + 1 the bid of that rank;
+            # the highest bid has no raise and keeps -1
+            best_bid[fits, total_dice, :last] = best_from
+            raise_prob[fits, total_dice, :last] = \
+                probs[fit_rows[:, np.newaxis], best_from]
+            bid_prob[fits, total_dice, 0] = 1.0
+            bid_prob[fits, total_dice, 1:last + 1] = probs
+        return cls(hands, best_bid, raise_prob, bid_prob)
+
+    # same result as rational_decision, or None outside the table
+    def lookup(self, hand_count, total_dice, current_bid):
+        i = self.hand_index.get(hand_key(hand_count))
+        if i is None or total_dice > self.max_dice:
+            return None
+        column = 0 if current_bid is None else current_bid + 1
+        bid = int(self.best_bid[i, total_dice, column])
+        raise_prob = float(self.raise_prob[i, total_dice, column])
+        bid_prob = float(self.bid_prob[i, total_dice, column])
+        if bid < 0:
+            return True, None, 0.0, bid_prob
+        return bid_prob < raise_prob, bid, raise_prob, bid_prob
+
+    # save as a directory of .npy files
+    def save(self, path):
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        with open(os.path.join(path, 'hands.json'), 'w') as f:
+            json.dump(self.hands, f)
+        for name in ('best_bid', 'raise_prob', 'bid_prob'):
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+        return
+
+    # load a saved table, the arrays memory-mapped read-only
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'hands.json')) as f:
+            hands = [tuple(hand) for hand in json.load(f)]
+        arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                  for name in ('best_bid', 'raise_prob', 'bid_prob')]
+        return cls(hands, *arrays)
+
+
+# memo of rational decisions keyed on (hand_count, total_dice, current_bid),
+# evicting the least recently used entry beyond max_size
+# misses are answered from a PolicyTable when one covers the state and
+# worked out with rational_decision otherwise
+class PolicyCache:
+    def __init__(self, prob_table, max_size=100000, table=None):
+        self.prob_table = prob_table
+        self.max_size = max_size
+        self.table = table
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, hand_count, total_dice, current_bid):
+        key = (hand_key(hand_count), total_dice, current_bid)
+        decision = self.entries.pop(key, None)
+        if decision is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            if self.table is not None:
+                decision = self.table.lookup(hand_count, total_dice,
+                                             current_bid)
+            if decision is None:
+                decision = rational_decision(self.prob_table, hand_count,
+                                             total_dice, current_bid)
+            if len(self.entries) >= self.max_size:
+                self.entries.popitem(last=False)
+        # (re)inserting puts the key at the most recently used end
+        self.entries[key] = decision
+        return decision
+
+
+# PolicyCaches over saved tables, one per path and process
+_policies = {}
+
+
+# the PolicyCache backed by the table saved at path, loaded once per
+# process so worker processes can be handed the path rather than the table
+def get_policy(path, rolling_prob=0.333):
+    policy = _policies.get(path)
+    if policy is None:
+        policy = PolicyCache(get_prob_table(rolling_prob),
+                             table=PolicyTable.load(path))
+        _policies[path] = policy
+    return policy
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+# precomputed binomial tail probabilities used by the bidding logic
+# entry [n, k] is the probability that a bid needing k more matching dice
+# is true when the other players hold n dice, i.e. 1 - binom.cdf(k, n, p)
+# for k > 0 and 1.0 when no more dice are needed
+class ProbTable:
+    def __init__(self, rolling_prob, max_dice):
+        self.rolling_prob = rolling_prob
+        self.max_dice = max_dice
+
+        # other-dice counts run down the rows, required successes across
+        # the columns; one extra column so that k = max_dice + 1 is valid
+        # the binomial pmf is built row by row from the one for a die less,
+        # which saves loading scipy.stats and agrees with its cdf to
+        # within a few ulps
+        pmf = np.zeros((max_dice + 1, max_dice + 2))
+        pmf[0, 0] = 1.0
+        for n in xrange(1, max_dice + 1):
+            pmf[n, 1:] = pmf[n - 1, 1:] * (1 - rolling_prob) + \
+                pmf[n - 1, :-1] * rolling_prob
+            pmf[n, 0] = pmf[n - 1, 0] * (1 - rolling_prob)
+        tail = 1.0 - np.cumsum(pmf, axis=1)
+        tail[:, 0] = 1.0
+        self.tail = tail
+
+    # probability that at least `required` more dice show up among the
+    # `num_other` dice of the other players
+    def bid_prob(self, num_other, required):
+        if required <= 0:
+            return 1.0
+        if required > self.max_dice:
+            return 0.0
+        return self.tail[num_other, required]
+
+    # same lookup for an array of required counts, clipped to the table
+    def bid_probs(self, num_other, required):
+        required = np.clip(required, 0, self.max_dice + 1)
+        return self.tail[num_other, required]
+
+    # score every bid on the table at once and return the rank of the most
+    # likely legal raise over current_bid (see bids.py) together with its
+    # probability; ties go to the lowest rank
+    def best_bid(self, hand_count, num_other, total_dice, current_bid):
+        quantities = np.arange(1, total_dice + 1)
+        # rows are face values 1-6, columns are quantities 1..total_dice,
+        # so the flattened grid is indexed by bid rank
+        required = quantities[np.newaxis, :] - \
+            np.asarray(hand_count)[:, np.newaxis]
+        probs = self.bid_probs(num_other, required).ravel()
+
+        # rule out every bid that does not raise the current one
+        if current_bid is not None:
+            probs[:current_bid + 1] = -1.0
+
+        best = int(np.argmax(probs))
+        return best, probs[best]
+
+    # best_bid for a batch of players, one row per player
+    # a current bid rank of -1 means there is no bid; returns arrays of
+    # bid ranks and probabilities with the same tie-breaking
+    def best_bids(self, hand_counts, num_other, total_dice, current_bid):
+        num = hand_counts.shape[0]
+        max_total = int(np.max(total_dice))
+        quantities = np.arange(1, max_total + 1)[np.newaxis, np.newaxis, :]
+        faces = np.arange(1, 7)[np.newaxis, :, np.newaxis]
+
+        required = quantities - hand_counts[:, :, np.newaxis]
+        probs = self.bid_probs(num_other[:, np.newaxis, np.newaxis], required)
+
+        # a bid has to fit on the table and raise the current bid
+        total_dice = total_dice[:, np.newaxis, np.newaxis]
+        ranks = (faces - 1) * total_dice + quantities - 1
+        legal = (quantities <= total_dice) & \
+            (ranks > current_bid[:, np.newaxis, np.newaxis])
+        probs[~legal] = -1.0
+
+        probs = probs.reshape(num, -1)
+        best = np.argmax(probs, axis=1)
+        rows = np.arange(num)
+        return ranks.reshape(num, -1)[rows, best], probs[rows, best]
+
+
+# one table per rolling probability, shared by every game in the process
+_tables = {}
+
+
+# return the shared table for rolling_prob, rebuilding it larger only when
+# a game needs more dice than the cached table covers
+def get_prob_table(rolling_prob, max_dice=30):
+    table = _tables.get(rolling_prob)
+    if table is None or table.max_dice < max_dice:
+        table = ProbTable(rolling_prob, max_dice)
+        _tables[rolling_prob] = table
+    return table
@@ -0,0 +1,240 @@
+import os
+import shutil
+
+import numpy as np
+
+from json_io import read_json, write_json
+
+
+# the columns every game fills in itself; config_id, seed and chunk are
+# shared by a whole run or chunk and filled in by the store
+game_columns = ('player_ranking', 'cumul_turns', 'num_rounds',
+                'mean_round_length')
+
+
+# room for the records of size games, to be filled in with record_game
+# records travel as a dict of the game_columns, so a worker process can
+# hand its games back to the process that holds the store
+def empty_records(size, num_players):
+    return {'player_ranking': np.full((size, num_players), -1,
+                                      dtype=np.int8),
+            'cumul_turns': np.zeros(size, dtype=np.int32),
+            'num_rounds': np.zeros(size, dtype=np.int32),
+            'mean_round_length': np.zeros(size, dtype=np.float64)}
+
+
+# fill in record i with a finished RunGame
+def record_game(records, i, liars):
+    records['player_ranking'][i, :len(liars.player_ranking)] = \
+        liars.player_ranking
+    records['cumul_turns'][i] = liars.cumul_turns
+    records['num_rounds'][i] = liars.round_stats.count
+    records['mean_round_length'][i] = liars.round_stats.mean
+    return
+
+
+# the records of every game of a finished BatchGame
+def batch_records(batch):
+    return {'player_ranking': batch.player_ranking,
+            'cumul_turns': batch.cumul_turns,
+            'num_rounds': batch.num_rounds,
+            'mean_round_length': batch.avg_round_lengths()}
+
+
+# on-disk store of per-game records, one numpy array per column
+# records are buffered in memory and written out chunk_size at a time as a
+# directory of .npy files (chunk_000000/, chunk_000001/, ...); chunks are
+# never rewritten, so a store can be reopened and appended to, and every
+# chunk can be read back memory-mapped
+class ResultStore:
+    # column name -> dtype; player_ranking has one entry per player, in the
+    # order they went out with the winner last, padded with -1
+    # seed is the seed of the run a game was played in, as given to
+    # run_trials, not a seed of its own, and chunk the index of the chunk
+    # of run_trials it was played in, -1 outside of one; a game is
+    # reproduced by replaying parallel.chunk_rng(seed, chunk), or the whole
+    # run for chunk -1
+    columns = (('config_id', np.int32),
+               ('seed', np.int64),
+               ('chunk', np.int32),
+               ('player_ranking', np.int8),
+               ('cumul_turns', np.int32),
+               ('num_rounds', np.int32),
+               ('mean_round_length', np.float64))
+
+    # num_players is needed to create a store, an existing store keeps the
+    # one it was created with
+    def __init__(self, path, num_players=None, chunk_size=65536, config_id=0,
+                 seed=0):
+        self.path = path
+        self.chunk_size = chunk_size
+        # recorded with every game unless add_game/add_batch are told
+        # otherwise
+        self.config_id = config_id
+        self.seed = seed
+
+        meta_path = os.path.join(path, 'store.json')
+        if os.path.exists(meta_path):
+            stored = read_json(meta_path)['num_players']
+            if num_players is not None and num_players != stored:
+                raise ValueError('%s holds games of %d players, not %d' %
+                                 (path, stored, num_players))
+            num_players = stored
+        else:
+            if num_players is None:
+                raise ValueError('num_players is needed to create a store')
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            write_json(meta_path, {'num_players': num_players})
+        self.num_players = num_players
+
+        # leftovers of a chunk that was being written when a run died
+        for name in os.listdir(path):
+            if name.startswith('.tmp_chunk_'):
+                shutil.rmtree(os.path.join(path, name))
+
+        self.next_chunk = self.num_chunks()
+        self.new_buffer()
+
+    def new_buffer(self):
+        self.buffer = {}
+        for (name, dtype) in self.columns:
+            if name == 'player_ranking':
+                shape = (self.chunk_size, self.num_players)
+            else:
+                shape = (self.chunk_size,)
+            self.buffer[name] = np.zeros(shape, dtype=dtype)
+        self.buffered = 0
+        return
+
+    def chunk_dir(self, index):
+        return os.path.join(self.path, 'chunk_%06d' % index)
+
+    # number of chunks already on disk
+    def num_chunks(self):
+        return len([name for name in os.listdir(self.path)
+                    if name.startswith('chunk_')])
+
+    # append one record, ranking padded with -1 up to num_players
+    def append(self, config_id, seed, chunk, ranking, cumul_turns, num_rounds,
+               mean_round_length):
+        self.check_players(len(ranking))
+        i = self.buffered
+        self.buffer['config_id'][i] = config_id
+        self.buffer['seed'][i] = seed
+        self.buffer['chunk'][i] = chunk
+        self.buffer['player_ranking'][i] = -1
+        self.buffer['player_ranking'][i, :len(ranking)] = ranking
+        self.buffer['cumul_turns'][i] = cumul_turns
+        self.buffer['num_rounds'][i] = num_rounds
+        self.buffer['mean_round_length'][i] = mean_round_length
+        self.buffered += 1
+        if self.buffered == self.chunk_size:
+            self.flush()
+        return
+
+    # record a finished RunGame, with the winner appended to its ranking
+    def add_game(self, liars, config_id=None, seed=None, chunk=-1):
+        if config_id is None:
+            config_id = self.config_id
+        if seed is None:
+            seed = self.seed
+        self.append(config_id, seed, chunk, liars.player_ranking,
+                    liars.cumul_turns, liars.round_stats.count,
+                    liars.round_stats.mean)
+        return
+
+    # record every game of a finished BatchGame
+    def add_batch(self, batch, config_id=None, seed=None, chunk=-1):
+        self.add_records(batch_records(batch), config_id, seed, chunk)
+        return
+
+    # record a dict of game_columns, see empty_records, all under the same
+    # config_id, seed and chunk
+    def add_records(self, records, config_id=None, seed=None, chunk=-1):
+        if config_id is None:
+            config_id = self.config_id
+        if seed is None:
+            seed = self.seed
+        (n, num_players) = records['player_ranking'].shape
+        self.check_players(num_players)
+        # fill the buffer a slice at a time rather than game by game
+        start = 0
+        while start < n:
+            size = min(self.chunk_size - self.buffered, n - start)
+            games = slice(start, start + size)
+            rows = slice(self.buffered, self.buffered + size)
+            self.buffer['config_id'][rows] = config_id
+            self.buffer['seed'][rows] = seed
+            self.buffer['chunk'][rows] = chunk
+            self.buffer['player_ranking'][rows] = -1
+            self.buffer['player_ranking'][rows, :num_players] = \
+                records['player_ranking'][games]
+            for name in game_columns[1:]:
+                self.buffer[name][rows] = records[name][games]
+            self.buffered += size
+            start += size
+            if self.buffered == self.chunk_size:
+                self.flush()
+        return
+
+    def check_players(self, num_players):
+        if num_players > self.num_players:
+            raise ValueError('a game of %d players does not fit a store of '
+                             '%d players' % (num_players, self.num_players))
+        return
+
+    # write the buffered records out as a new chunk
+    # the chunk is written to a temporary directory and renamed into place,
+    # so a chunk directory on disk is always complete
+    def flush(self):
+        if self.buffered == 0:
+            return
+        tmp_dir = os.path.join(self.path, '.tmp_chunk_%06d' % self.next_chunk)
+        os.makedirs(tmp_dir)
+        for (name, dtype) in self.columns:
+            np.save(os.path.join(tmp_dir, name + '.npy'),
+                    self.buffer[name][:self.buffered])
+        os.rename(tmp_dir, self.chunk_dir(self.next_chunk))
+        self.next_chunk += 1
+        self.new_buffer()
+        return
+
+    def close(self):
+        self.flush()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    #### Reading back ####
+
+    # the columns of one chunk as read-only memory-mapped arrays
+    def read_chunk(self, index):
+        chunk = {}
+        for (name, dtype) in self.columns:
+            chunk[name] = np.load(os.path.join(self.chunk_dir(index),
+                                               name + '.npy'), mmap_mode='r')
+        return chunk
+
+    # every chunk of one column, memory-mapped
+    def column_chunks(self, name):
+        return [np.load(os.path.join(self.chunk_dir(i), name + '.npy'),
+                        mmap_mode='r')
+                for i in xrange(self.num_chunks())]
+
+    # one column of the whole store as a single in-memory array
+    def load_column(self, name):
+        chunks = self.column_chunks(name)
+        if not chunks:
+            return np.zeros(0, dtype=dict(self.columns)[name])
+        return np.concatenate(chunks)
+
+    # number of records on disk
+    def num_records(self):
+        return sum(chunk.shape[0]
+                   for chunk in self.column_chunks('cumul_turns'))
@@ -1,40 +1,75 @@
 #!/usr/local/bin/python
 
-import matplotlib.patches as mpatches
-import matplotlib.pyplot as plt
 import numpy as np
-import operator
-import os
-import random
-from scipy.stats import binom
-import time
+
+from bids import first_raise, num_bids, rank_to_bid
+from instrument import instrument
+from prob_table import get_prob_table
+from stats import GameStats, RunningStats
+from strategies import Observations, builtin_personalities, decide, \
+    resolve_strategies
 
 
 # utilities for running the actual rounds of the game
 # inherits the gamestate class, as that is what it manipulates
 class RunGame:
     # initial distribution (roll the dies)
-    def __init__(self, num_players, dice_per_player, personalities):
+    def __init__(self, num_players, dice_per_player, personalities,
+                 prob_table=None, rng=None, naive_threshold=0.5,
+                 bluff_threshold=0.1, policy=None, dice_source=None,
+                 strategies=None):
+
+        # source of all randomness in the game, the global numpy generator
+        # unless a seeded np.random.RandomState is passed in
+        if rng is None:
+            rng = np.random
+        self.rng = rng
 
         # note: here we are rounding 1/3 to the float 0.333
         self.rolling_prob = 0.333
         self.num_players = num_players
+        self.dice_per_player = dice_per_player
         self.total_dice = dice_per_player * self.num_players
 
+        # binomial tail lookups, shared across games unless one is passed in
+        if prob_table is None:
+            prob_table = get_prob_table(self.rolling_prob, self.total_dice)
+        self.prob_table = prob_table
+        # optional policy.PolicyCache that rational decisions are looked up in
+        self.policy = policy
+        # optional source of pre-generated dice and per-player decision
+        # streams (see crn.py), both come from rng when there is none
+        self.dice_source = dice_source
+        # number of times the dice have been rolled
+        self.num_rolls = 0
+        # personalities beyond the built-in three, or built-in ones
+        # overridden in strategies (a dict by personality), decide through
+        # the strategy interface
+        self.strategies = None
+        if strategies is not None or \
+                not set(personalities) <= set(builtin_personalities):
+            self.strategies = resolve_strategies(personalities, strategies,
+                                                 naive_threshold,
+                                                 bluff_threshold)
+
         self.player_hands = []
         self.player_dice = []
         self.player_types = personalities
 
         # flag that determines when to reroll dice
         self.roll_flag = 0
-        self.round_lengths = []
+        # running stats of the round lengths, the current round's turns
+        # are counted in round_counter until the round ends
+        self.round_stats = RunningStats()
         self.round_counter = 0
 
         # no need to shuffle as already random, one array per player
         for i in xrange(1,self.num_players+1):
-            roll = np.random.randint(1,7,dice_per_player)
+            roll = self.roll_hand(i - 1, dice_per_player)
             self.player_hands.append(roll)
             self.player_dice.append(dice_per_player)
+        self.num_rolls += 1
+        self.count_faces()
 
         # total number of turns in game so far
         self.cumul_turns = 0
@@ -44,19 +79,19 @@ class RunGame:
         self.previous_player = None
         self.game_over = 0
 
-        # the current bid is a tuple of quantity and face value
-        # i.E. initial bid is that there is at least one dice with
-        # face value 2
+        # the current bid is the rank of a quantity and face value
+        # (see bids.py), i.E. rank 0 is the bid that there is at least
+        # one dice with face value 1
         self.current_bid = None
 
         # parameters for players:
         # naive_threshold is the probability with which a naive
         # player chooses to call
-        self.naive_threshold = 0.5
+        self.naive_threshold = naive_threshold
 
         # probability that a bluffing player commits the
         # opposite of the rational action
-        self.bluff_threshold = 0.1
+        self.bluff_threshold = bluff_threshold
 
         # player ranking, tracks who loses the game first
         # for example [3,1,2] means that player 3 is in last place
@@ -74,10 +109,36 @@ class RunGame:
             # implies the player has dice which to roll
             if cur_dice > 0:
                 new_total += cur_dice
-                new_hand = np.random.randint(1,7,cur_dice)
+                new_hand = self.roll_hand(i, cur_dice)
                 self.player_hands[i] = new_hand
 
+        self.num_rolls += 1
         self.total_dice = new_total
+        self.count_faces()
+        return
+
+    # fresh hand of num_dice dice for player i
+    def roll_hand(self, i, num_dice):
+        if self.dice_source is None:
+            return self.rng.randint(1,7,num_dice)
+        return self.dice_source.roll(self.num_rolls, i, num_dice)
+
+    # tally each player's face counts and the matching dice on the whole
+    # table once per roll, so every query during the round is a lookup
+    def count_faces(self):
+        # hand_counts[i] holds how many of each face value 1-6 player i has,
+        # players who are out keep a row of zeros
+        self.hand_counts = np.zeros((self.num_players, 6), dtype=np.int64)
+        for i in xrange(0,self.num_players):
+            if self.player_dice[i] > 0:
+                hand = self.player_hands[i]
+                self.hand_counts[i] = np.bincount(hand, minlength=7)[1:]
+
+        # ones are wild, so matching_dice[v - 1] is the number of dice
+        # on the table that count towards a bid on face value v
+        face_totals = self.hand_counts.sum(axis=0)
+        self.matching_dice = face_totals + face_totals[0]
+        self.matching_dice[0] = face_totals[0]
         return
 
 
@@ -89,105 +150,81 @@ class RunGame:
         if self.current_bid is None:
             return 1.0
         else:
-            # get current player's dice
-            player_hand = self.player_hands[self.current_player]
+            (quantity, face_value) = rank_to_bid(self.current_bid,
+                                                 self.total_dice)
 
             # subtract the current player's matching dice from the
             # bid count
-            face_value = self.current_bid[1]
 
             # occurrences of the face value in the current player's hand
-
-            frequency = list(player_hand.flatten()).count(face_value)
+            frequency = self.hand_counts[self.current_player, face_value - 1]
 
             # the number of occurrences of the current bids face value
             # for required in other player's hands for the bid to be true
-            other_freq = self.current_bid[0] - frequency
+            other_freq = quantity - frequency
 
             if other_freq == 0:
                 return 1.0
             else:
                 # total number of dice of other players
-                num_other_dice = self.total_dice - len(player_hand)
+                num_other_dice = (self.total_dice -
+                                  self.player_dice[self.current_player])
 
-                # calculate probability based on binomial distr.
-                trials, p = num_other_dice, self.rolling_prob
+                # look up probability based on binomial distr.
                 # the prob is converse of the cdf, as we want
                 # to know probability of at least that many successes
-                prob = 1.0 - binom.cdf(other_freq, trials, p)
-                return prob
+                return self.prob_table.bid_prob(num_other_dice, other_freq)
 
+    # all the possible new bids, a contiguous range of bid ranks
     def get_possible_bids(self):
-        # list of all the possible new bids
-        possible_bids = []
-        if self.current_bid is None:
-            frequency = 0
-            face_value = 1
-
-        else:
-            frequency = self.current_bid[0]
-            face_value = self.current_bid[1]
-
-        # bids keeping face value the same and raising frequency
-        for i in range(frequency + 1, self.total_dice + 1):
-            possible_bids.append((i, face_value))
-
-        # bids raising the face value
-        for j in range(face_value + 1, 7):
-            for k in range(1, self.total_dice + 1):
-                possible_bids.append((k, j))
-        return possible_bids
+        return xrange(first_raise(self.current_bid), num_bids(self.total_dice))
 
     # calculate probabilities of potential new bids being true
     # from the current player's perspective,
-    # return the most likely one
-    def calc_rational_bid(self, return_val=0):
-        possible_bids = self.get_possible_bids()
-        # dictionary which stores the bids as keys and has
-        # the probability of the bid being true as values
-        bids_dict = {}
-
-        # get current player's dice
-        player_hand = self.player_hands[self.current_player]
-
-        # dict which tells you how much of each die a player has
-        hand_count = {}
-        hand_list = list(player_hand.flatten())
-        for i in range(1,7):
-            hand_count[i] = hand_list.count(i)
-
-        num_other_dice = self.total_dice - len(player_hand)
-        p = self.rolling_prob
-        for tup in possible_bids:
-            freq = tup[0]
-            val = tup[1]
-            required_successes = freq - hand_count[val]
-            if required_successes == 0:
-                bids_dict[tup] = 1.0
-            else:
-                prob = 1.0 - binom.cdf(freq - hand_count[val], num_other_dice, p)
-                bids_dict[tup] = prob
-
-        # return key with max value
-        # print bids_dict
-        suggested_bid = max(bids_dict.iteritems(), key=operator.itemgetter(1))[0]
-        suggest_bid_prob = bids_dict[suggested_bid]
-
-        if return_val == 0:
-            return suggested_bid
-
-        if return_val == 1:
-            return suggest_bid_prob
+    # return the most likely one together with its probability
+    def calc_rational_bid(self):
+        # how much of each face value 1-6 the player has
+        hand_count = self.hand_counts[self.current_player]
+
+        num_other_dice = self.total_dice - self.player_dice[self.current_player]
+        return self.prob_table.best_bid(hand_count, num_other_dice,
+                                        self.total_dice, self.current_bid)
+
+    # the rational move for the current player: whether to call, which is
+    # when the current bid is less likely than the best raise, and the best
+    # raise to make otherwise
+    def rational_action(self):
+        if self.policy is not None:
+            (call, bid, _, _) = self.policy.lookup(
+                self.hand_counts[self.current_player], self.total_dice,
+                self.current_bid)
+            return call, bid
+        (suggested_bid, make_new_bid_prob) = self.calc_rational_bid()
+        return self.check_bid_prob() < make_new_bid_prob, suggested_bid
 
     # chooses a new bid uniformly at random from potential new bids
     def calc_naive_bid(self):
-        possible_bids = self.get_possible_bids()
-        return random.choice(possible_bids)
+        first = first_raise(self.current_bid)
+        return first + self.decision_rng().randint(num_bids(self.total_dice)
+                                                   - first)
+
+    # random stream for the current player's coin flips and naive bids
+    def decision_rng(self):
+        if self.dice_source is None:
+            return self.rng
+        return self.dice_source.decision_rng(self.current_player)
 
 
     # decides which action to do based on player personality and
     # executes it
+    # the built-in personalities are also strategies.Rational, Naive and
+    # Bluffing, which decide alike but draw their random numbers in another
+    # order; they are coded out here so seeded runs stay as they were
     def decide_action(self, player_pers):
+        if self.strategies is not None:
+            self.strategy_action(player_pers)
+            return
+
         # must make a bid if there currently is no bid
         # corner case if you reach the highest bid possible
         if self.previous_player is None or self.current_bid is None:
@@ -196,31 +233,32 @@ class RunGame:
                 self.make_new_bid(self.calc_naive_bid())
             # bluffer and rational player make a rational bid
             else:
-                self.make_new_bid(self.calc_rational_bid())
+                (_, suggested_bid) = self.rational_action()
+                self.make_new_bid(suggested_bid)
             return
 
         # has the option to call and will decide based on personality
         else:
-            (quantity, face_value) = self.current_bid
-            if face_value == 6 and quantity == self.total_dice:
+            # the highest bid is total_dice sixes
+            if self.current_bid == num_bids(self.total_dice) - 1:
                 self.call_on_bid()
                 return
 
             # rational player
             if player_pers == 0:
-                make_new_bid_prob = self.calc_rational_bid(return_val=1)
+                (rational_call, suggested_bid) = self.rational_action()
                 # prob of current bid being true is below threshold, so call
-                if self.check_bid_prob() < make_new_bid_prob:
+                if rational_call:
                     self.call_on_bid()
                 # rational decision is to make a new bid
                 else:
-                    self.make_new_bid(self.calc_rational_bid())
+                    self.make_new_bid(suggested_bid)
                 return
 
             # naive player
             elif player_pers == 1:
                 # calls with probability self.naive_threshold
-                if random.uniform(0,1) < self.naive_threshold:
+                if self.decision_rng().random_sample() < self.naive_threshold:
                     self.call_on_bid()
                 # otherwise makes a naive bid
                 else:
@@ -229,28 +267,45 @@ class RunGame:
 
             # bluffing player
             else:
-                make_new_bid_prob = self.calc_rational_bid(return_val=1)
+                (rational_call, suggested_bid) = self.rational_action()
                 # prob of current bid being true is below threshold, so should call
                 # rational move is to call but with some prob you raise the bid
-                if self.check_bid_prob() < make_new_bid_prob:
+                if rational_call:
                     # with prob bluff_threshold will go opposite and bid
-                    if random.uniform(0,1) < self.bluff_threshold:
-                        self.make_new_bid(self.calc_rational_bid())
+                    if self.decision_rng().random_sample() < self.bluff_threshold:
+                        self.make_new_bid(suggested_bid)
                     else:
                         self.call_on_bid()
                 # rational decision is to make a new bid, 
                 # but with some prob you call
                 else:
                     # with prob bluff_threshold calls instead of making the bid
-                    if random.uniform(0,1) < self.bluff_threshold:
+                    if self.decision_rng().random_sample() < self.bluff_threshold:
                         self.call_on_bid()
                     else:
-                        self.make_new_bid(self.calc_rational_bid())
+                        self.make_new_bid(suggested_bid)
                 return
 
         return
 
 
+    # decides through the strategy interface, as a batch of one turn
+    def strategy_action(self, player_pers):
+        player = self.current_player
+        current_bid = -1 if self.current_bid is None else self.current_bid
+        obs = Observations(self.hand_counts[[player]],
+                           np.array([self.total_dice]),
+                           np.array([current_bid]),
+                           np.array([self.player_dice]), np.array([player]),
+                           self.prob_table, self.decision_rng())
+        (call, bid) = decide(self.strategies, np.array([player_pers]), obs)
+        if call[0]:
+            self.call_on_bid()
+        else:
+            self.make_new_bid(int(bid[0]))
+        return
+
+
     # method that checks if only one player remains, if so updates global flag
     def check_if_game_won(self):
         x = [i for i in self.player_dice if i > 0]
@@ -262,17 +317,9 @@ class RunGame:
     # method to execute the calling of a bid, handles changing of all
     # global variables
     def call_on_bid(self):
-        (count,face_value) = self.current_bid
+        (count,face_value) = rank_to_bid(self.current_bid, self.total_dice)
         # cnt is number of actual occurences of the face value plus wild cards
-        cnt = 0
-
-        for i in xrange(0,self.num_players):
-            # implies the player is active
-            if self.player_dice[i] > 0:
-                x = self.player_hands[i]
-                for j in xrange(0,x.size):
-                    if (x[j] == 1) or (x[j] == face_value):
-                        cnt += 1
+        cnt = self.matching_dice[face_value - 1]
 
         # previous bid was true, current player loses a die
         if cnt >= count:
@@ -345,7 +392,7 @@ class RunGame:
             # only roll once a player loses a die
             if self.roll_flag == 1:
                 self.roll_dice()
-                self.round_lengths.append(self.round_counter)
+                self.round_stats.add(self.round_counter)
                 self.round_counter = 0
                 # set flag back to 0 after rolling
                 self.roll_flag = 0
@@ -361,7 +408,11 @@ class RunGame:
         print('Current Number of Dice: ' + str(self.player_dice))
         print('Current Player Hand: ') + str(self.player_hands[self.current_player])
         print('Total Dice: ' + str(self.total_dice))
-        print('Current Bid: ') + str(self.current_bid)
+        if self.current_bid is None:
+            print('Current Bid: None')
+        else:
+            print('Current Bid: ') + str(rank_to_bid(self.current_bid,
+                                                     self.total_dice))
         print('\n')
         return
 
@@ -371,7 +422,8 @@ class RunGame:
         print('Total Turns: ') + str(self.cumul_turns)
 
     def print_rounds(self):
-        print(self.round_lengths)
+        print('Rounds: %d, Average Turns Per Round: %f' %
+              (self.round_stats.count, self.round_stats.mean))
         final_ranking = list(reversed([x + 1 for x in self.player_ranking]))
         print final_ranking
         print('Ranking:')
@@ -381,193 +433,94 @@ class RunGame:
 
 
 #### Utilities for Running Statistics ####
-def average(lst):
-    return float(sum(lst)) / float(len(lst))
-
-
-def simulate_game(n, num_players, dice_per_player, personalities):
-    total_turns_list = []
-    avg_turns_list = []
-    winners_list = []
+# play one game to the end and return it, with the winner appended
+# to the player ranking
+# profiler (an instrument.Profiler) and trace (an event sink) are opt-in
+# instrumentation, see instrument.py, and recorder is an optional
+# turn_log.TurnLog the turns are written to
+def play_game(num_players, dice_per_player, personalities, rng=None,
+              naive_threshold=0.5, bluff_threshold=0.1, profiler=None,
+              trace=None, policy=None, dice_source=None, recorder=None,
+              strategies=None):
+    liars = RunGame(num_players, dice_per_player, personalities, rng=rng,
+                    naive_threshold=naive_threshold,
+                    bluff_threshold=bluff_threshold, policy=policy,
+                    dice_source=dice_source, strategies=strategies)
+    instrument(liars, profiler, trace)
+    if recorder is not None:
+        recorder.attach(liars)
+    while True:
+        # liars.print_state()
+        turn = liars.simulate_one_turn()
+        if turn == 1:
+            liars.player_ranking.append(liars.current_player)
+            return liars
+
+
+# play n games, adding each one to stats as soon as it finishes
+# pass in a GameStats to read the running estimates while the run is in
+# progress, report_every > 0 prints them every that many games
+# sink is an optional ResultStore that every game is also recorded to,
+# under config_id and seed, the seed rng was made from, where they are given
+# policy is an optional policy.PolicyCache the rational decisions are looked
+# up in, which plays the same games faster
+def run_games(n, num_players, dice_per_player, personalities, stats=None,
+              report_every=0, sink=None, profiler=None, trace=None, rng=None,
+              recorder=None, strategies=None, config_id=None, seed=None,
+              policy=None):
+    if stats is None:
+        stats = GameStats(num_players)
+    for i in xrange(n):
+        liars = play_game(num_players, dice_per_player, personalities,
+                          rng=rng, profiler=profiler, trace=trace,
+                          recorder=recorder, strategies=strategies,
+                          policy=policy)
+        stats.add_game(liars)
+        if sink is not None:
+            sink.add_game(liars, config_id, seed)
+        if report_every > 0 and (i + 1) % report_every == 0:
+            print(stats.summary())
+    return stats
+
+
+def simulate_game(n, num_players, dice_per_player, personalities, stats=None,
+                  report_every=0, sink=None, policy=None):
+    stats = run_games(n, num_players, dice_per_player, personalities, stats,
+                      report_every, sink, policy=policy)
+
+    print('Average Total Turn Length: %f' % stats.turns.mean)
+    print('Average Turns Per Round: %f ' % stats.round_lengths.mean)
 
-    for i in range(n):
-        # instantiate the RunGame class
-        liars = RunGame(num_players, dice_per_player, personalities)
-
-        while True:
-            # liars.print_state()
-            turn = liars.simulate_one_turn()
-            if turn == 1:
-                winners_list.append(liars.current_player + 1)
-                liars.player_ranking.append(liars.current_player)
-                break
-
-        avg_round_length = average(liars.round_lengths)
-        avg_turns_list.append(avg_round_length)
-        total_turns_list.append(liars.cumul_turns)
-
-
-    print('Average Total Turn Length: %f' % average(total_turns_list))
-    print('Average Turns Per Round: %f ' % average(avg_turns_list))
-
-    win_count_dict = {}
-    for player in set(winners_list):
-        win_count_dict[player] = winners_list.count(player)
     # print('Frequency of Winners:')
-    # print win_count_dict
+    # print stats.rankings.counts[:, 0]
     return
 
 
 
 # format of personalities here is one player of a type and five of another
 # type, such that player 0 is the player whose ranking distribution we want
-def simulate_one_vs_many(n, num_players, dice_per_player, personalities):
-    winners_list = []
-    # in each game, track the place that the player comes in, and store it
-    one_player_rankings = []
-    ranking_count_dict = {}
-
-    for i in range(n):
-        # print i
-        # instantiate the RunGame class
-        liars = RunGame(num_players, dice_per_player, personalities)
-
-        while True:
-            # liars.print_state()
-            turn = liars.simulate_one_turn()
-            if turn == 1:
-                winners_list.append(liars.current_player + 1)
-                liars.player_ranking.append(liars.current_player)
-                break
-
-        player_id = 0
-        ranking = liars.player_ranking
-        # get the ranking in descending order from first to last
-        ranking.reverse()
-        one_player_rankings.append(ranking.index(player_id))
-
-    # build the probability distribution
-    for i in range(num_players):
-        count = one_player_rankings.count(i)
-        ranking_count_dict[i] = count
-
-    win_count_dict = {}
-    for player in set(winners_list):
-        win_count_dict[player] = winners_list.count(player)
-    # print('Frequency of Winners:')
-    # print win_count_dict
-    # print '\n'
-    return ranking_count_dict
+def simulate_one_vs_many(n, num_players, dice_per_player, personalities,
+                         stats=None, report_every=0, sink=None, policy=None):
+    # in each game, track the place that the player comes in
+    stats = run_games(n, num_players, dice_per_player, personalities, stats,
+                      report_every, sink, policy=policy)
+    return stats.rankings.ranking_dict(0)
 
 # format of personalities here will be [0,1,2]
-# so one rational, one naive, and one bluffing player
-def simulate_mixed(n, num_players, dice_per_player, personalities):
-    total_turns_list = []
-    avg_turns_list = []
-    winners_list = []
+# so one rational, one naive, and one bluffing player; other mixes work too
+# and every player's distribution is returned, in player order
+def simulate_mixed(n, num_players, dice_per_player, personalities,
+                   stats=None, report_every=0, sink=None, policy=None):
+    # in each game, track the place that each player comes in
+    stats = run_games(n, num_players, dice_per_player, personalities, stats,
+                      report_every, sink, policy=policy)
 
-    # in each game, track the place that each player comes in, and store it
-    naive_rankings = []
-    naive_ranking_count_dict = {}
+    # the probability distributions for each player
+    return [stats.rankings.ranking_dict(player)
+            for player in xrange(num_players)]
 
-    rational_rankings = []
-    rational_ranking_count_dict = {}
 
-    bluffing_rankings = []
-    bluffing_ranking_count_dict = {}
-
-
-    for i in range(n):
-        # print i
-        # instantiate the RunGame class
-        liars = RunGame(num_players, dice_per_player, personalities)
-
-        while True:
-            # liars.print_state()
-            turn = liars.simulate_one_turn()
-            if turn == 1:
-                winners_list.append(liars.current_player + 1)
-                liars.player_ranking.append(liars.current_player)
-                break
-
-        ranking = liars.player_ranking
-        ranking.reverse()
-        # get the ranking in descending order from first to last
-        rational_rankings.append(ranking.index(0))
-        naive_rankings.append(ranking.index(1))
-        bluffing_rankings.append(ranking.index(2))
-
-    # print 'WINNERS'
-    # print winners_list
-
-    # build the probability distributions for each player
-    for i in range(num_players):
-        rational_count = rational_rankings.count(i)
-        rational_ranking_count_dict[i] = rational_count
-
-        naive_count = naive_rankings.count(i)
-        naive_ranking_count_dict[i] = naive_count
-
-        bluffing_count = bluffing_rankings.count(i)
-        bluffing_ranking_count_dict[i] = bluffing_count
-
-    return [rational_ranking_count_dict, naive_ranking_count_dict, bluffing_ranking_count_dict]
-
-
-# code that we actually want to run
+# the experiments and plots are run from cli.py, this runs the lot
 if __name__ == "__main__":
-    #### Mixed Trial Simulation ####
-    num_players = 3
-    dice_per_player = 5
-    # 0 is rational, 1 is naive, 2 is bluffer
-    personalities = [0,1,2]
-    number_of_trials = 100
-    ranking_dicts = simulate_mixed(number_of_trials, num_players, dice_per_player, personalities)
-
-    percents = []
-    places = [i + 1 for i in ranking_dicts[0].keys()]
-    for d in ranking_dicts:
-        place_freq = d.values()
-        place_percents = [k / float(number_of_trials) for k in place_freq]
-        percents.append(place_percents)
-
-    print('\nMixed Trial: One of Each')
-    print('Gambling Personalities')
-    print personalities
-
-    for i in range(num_players):
-        print 'Player: %d' % i
-        print percents[i]
-
-    print('\n\n')
-
-
-    #### One Vs. Many Trial Simulation ####
-    print('One Vs. Many Trial Simulation\n')
-    num_players = 6
-    dice_per_player = 5
-    # 0 is rational, 1 is naive, 2 is bluffer
-    personalities = [0,1,1,1,1,1]
-    number_of_trials = 100
-    # simulate_game(number_of_trials, num_players, dice_per_player, personalities)
-    rank_distr = simulate_one_vs_many(number_of_trials, num_players, dice_per_player, personalities)
-    places = [i + 1 for i in rank_distr.keys()]
-    place_freq = rank_distr.values()
-    place_percents = [k / float(number_of_trials) for k in place_freq]
-    # print('Possible ranks')
-    # print places
-    print('Place Count Frequencies')
-    print place_freq
-    print('Place Probabilities')
-    print place_percents
-
-    #### GRAPHING ####
-    plt.bar(places, place_percents, width=1, color='purple')
-    plt.xlabel('Ranking Position', fontsize=20)
-    plt.ylabel('Probability', fontsize=20)
-    plt.title('Probability Distr. 1 Rational vs. 5 Naive Players', y=1.03, fontsize=20)
-    purple_patch = mpatches.Patch(color='purple', label='n = 1000')
-    plt.legend(handles=[purple_patch])
-    plt.savefig('1rational5naive.png')
-    plt.show()
-
+    from cli import main
+    main(['all', '--show'])
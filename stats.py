@@ -0,0 +1,171 @@
+import math
+
+import numpy as np
+
+
+# running mean and variance of a stream of numbers (Welford's method),
+# constant memory no matter how many values are added
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # sum of squared differences from the current mean
+        self.m2 = 0.0
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / float(self.count)
+        self.m2 += delta * (x - self.mean)
+        return
+
+    # add an array of values at once
+    def add_array(self, values):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        batch = RunningStats()
+        batch.count = values.size
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        self.merge(batch)
+        return
+
+    # fold in the stats of another stream (Chan et al.'s parallel update)
+    def merge(self, other):
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / float(count)
+        self.m2 += other.m2 + \
+            delta * delta * self.count * other.count / float(count)
+        self.count = count
+        return
+
+    # sample variance, 0.0 until there are two values
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    # standard error of the mean
+    def std_error(self):
+        if self.count < 2:
+            return 0.0
+        return math.sqrt(self.variance() / self.count)
+
+    # plain dict for JSON, floats survive the round trip exactly
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.count = d['count']
+        stats.mean = d['mean']
+        stats.m2 = d['m2']
+        return stats
+
+
+# how often each player finished in each place, 0 being the winner
+class RankingHistogram:
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.num_games = 0
+        # counts[player, place]
+        self.counts = np.zeros((num_players, num_players), dtype=np.int64)
+
+    # add one game, ranking lists players in the order they went out with
+    # the winner last
+    def add(self, ranking):
+        for (i, player) in enumerate(ranking):
+            self.counts[player, self.num_players - 1 - i] += 1
+        self.num_games += 1
+        return
+
+    # add many games from an array of places[game, player]
+    def add_places(self, places):
+        for player in xrange(self.num_players):
+            self.counts[player] += np.bincount(places[:, player],
+                                               minlength=self.num_players)
+        self.num_games += places.shape[0]
+        return
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.num_games += other.num_games
+        return
+
+    # {place: count} for one player, the format the simulate_* drivers return
+    def ranking_dict(self, player):
+        return dict((i, int(self.counts[player, i]))
+                    for i in range(self.num_players))
+
+    # running estimate of the probability of each place for one player
+    def probabilities(self, player):
+        if self.num_games == 0:
+            return np.zeros(self.num_players)
+        return self.counts[player] / float(self.num_games)
+
+
+# everything the simulate_* drivers report, updated as each game finishes
+class GameStats:
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.rankings = RankingHistogram(num_players)
+        # total turns per game and average turns per round per game
+        self.turns = RunningStats()
+        self.round_lengths = RunningStats()
+
+    def num_games(self):
+        return self.rankings.num_games
+
+    # add a finished RunGame, with the winner appended to its ranking
+    def add_game(self, liars):
+        self.add_result(liars.player_ranking, liars.cumul_turns,
+                        liars.round_stats.mean)
+        return
+
+    # add one game from its ranking, total turns and average round length
+    def add_result(self, ranking, cumul_turns, avg_round_length):
+        self.rankings.add(ranking)
+        self.turns.add(cumul_turns)
+        self.round_lengths.add(avg_round_length)
+        return
+
+    # add every game of a finished BatchGame
+    def add_batch(self, batch):
+        self.rankings.add_places(batch.places())
+        self.turns.add_array(batch.cumul_turns)
+        self.round_lengths.add_array(batch.avg_round_lengths())
+        return
+
+    def merge(self, other):
+        self.rankings.merge(other.rankings)
+        self.turns.merge(other.turns)
+        self.round_lengths.merge(other.round_lengths)
+        return
+
+    def to_dict(self):
+        return {'num_players': self.num_players,
+                'num_games': self.num_games(),
+                'place_counts': self.rankings.counts.tolist(),
+                'turns': self.turns.to_dict(),
+                'round_lengths': self.round_lengths.to_dict()}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls(d['num_players'])
+        stats.rankings.counts[:] = d['place_counts']
+        stats.rankings.num_games = d['num_games']
+        stats.turns = RunningStats.from_dict(d['turns'])
+        stats.round_lengths = RunningStats.from_dict(d['round_lengths'])
+        return stats
+
+    # one line with the running estimates, for progress reports
+    def summary(self):
+        return ('games: %d  turns/game: %.3f (+/- %.3f)  '
+                'turns/round: %.3f (+/- %.3f)' %
+                (self.num_games(), self.turns.mean, self.turns.std_error(),
+                 self.round_lengths.mean, self.round_lengths.std_error()))
@@ -0,0 +1,177 @@
+import numpy as np
+
+from bids import num_bids, rank_to_bid
+
+
+# what a player sees when it is their turn, for a batch of k turns at once:
+#   hand_counts[k, 6]   their own dice per face value 1-6
+#   total_dice[k]       dice on the table
+#   current_bid[k]      rank of the bid to beat (see bids.py), -1 for none
+#   player_dice[k, P]   dice count of every player
+#   player[k]           whose turn it is
+# together with the probability table and the generator to draw from
+# the probabilities and bids every strategy may want are worked out on
+# first use and kept, so strategies sharing an Observations share the work
+class Observations:
+    def __init__(self, hand_counts, total_dice, current_bid, player_dice,
+                 player, prob_table, rng=None, chunk_size=65536):
+        if rng is None:
+            rng = np.random
+        self.hand_counts = hand_counts
+        self.total_dice = total_dice
+        self.current_bid = current_bid
+        self.player_dice = player_dice
+        self.player = player
+        self.prob_table = prob_table
+        self.rng = rng
+        # rational bids are scored this many turns at a time to bound memory
+        self.chunk_size = chunk_size
+        self.size = total_dice.size
+        self.cache = {}
+
+    # the turns at the given rows
+    def take(self, rows):
+        return Observations(self.hand_counts[rows], self.total_dice[rows],
+                            self.current_bid[rows], self.player_dice[rows],
+                            self.player[rows], self.prob_table, self.rng,
+                            self.chunk_size)
+
+    # dice held by the other players
+    def num_other(self):
+        rows = np.arange(self.size)
+        return self.total_dice - self.player_dice[rows, self.player]
+
+    # probability that the current bid is true, 1.0 where there is no bid
+    def bid_probs(self):
+        if 'bid_probs' not in self.cache:
+            (quantity, face) = rank_to_bid(self.current_bid, self.total_dice)
+            freq = self.hand_counts[np.arange(self.size), face - 1]
+            probs = self.prob_table.bid_probs(self.num_other(),
+                                              quantity - freq)
+            probs[self.current_bid < 0] = 1.0
+            self.cache['bid_probs'] = probs
+        return self.cache['bid_probs']
+
+    # most likely legal raise and its probability, as calc_rational_bid
+    # picks it; meaningless where the current bid is the highest one
+    def best_bids(self):
+        if 'best_bids' not in self.cache:
+            bid = np.zeros(self.size, dtype=np.int64)
+            prob = np.zeros(self.size)
+            num_other = self.num_other()
+            for start in xrange(0, self.size, self.chunk_size):
+                chunk = slice(start, start + self.chunk_size)
+                (bid[chunk], prob[chunk]) = self.prob_table.best_bids(
+                    self.hand_counts[chunk], num_other[chunk],
+                    self.total_dice[chunk], self.current_bid[chunk])
+            self.cache['best_bids'] = (bid, prob)
+        return self.cache['best_bids']
+
+    # whether calling beats the best raise
+    def rational_calls(self):
+        return self.bid_probs() < self.best_bids()[1]
+
+    # one uniformly random legal raise per turn
+    def random_raises(self):
+        first = self.current_bid + 1
+        num_raises = num_bids(self.total_dice) - first
+        pick = self.rng.random_sample(self.size) * num_raises
+        return first + pick.astype(np.int64)
+
+
+# a strategy is any object with a decide(obs) method mapping a batch of
+# Observations to arrays (call, bid): whether each player calls, and the
+# rank they raise to where they don't
+# the engine makes players raise when there is no bid and call the highest
+# bid, whatever the strategy says, so strategies need not check for either
+
+
+# calls when the current bid is less likely than the best raise, and makes
+# that raise otherwise
+class Rational:
+    def decide(self, obs):
+        return obs.rational_calls(), obs.best_bids()[0]
+
+
+# calls with probability threshold, otherwise raises at random
+class Naive:
+    def __init__(self, threshold=0.5):
+        self.threshold = threshold
+
+    def decide(self, obs):
+        bid = obs.random_raises()
+        return obs.rng.random_sample(obs.size) < self.threshold, bid
+
+
+# does the opposite of the rational action with probability threshold
+class Bluffing:
+    def __init__(self, threshold=0.1):
+        self.threshold = threshold
+
+    def decide(self, obs):
+        flip = obs.rng.random_sample(obs.size) < self.threshold
+        return obs.rational_calls() != flip, obs.best_bids()[0]
+
+
+# the personalities built into the engines, keyed as in personalities lists
+builtin_personalities = (0, 1, 2)
+
+
+def builtin_strategies(naive_threshold=0.5, bluff_threshold=0.1):
+    return {0: Rational(), 1: Naive(naive_threshold),
+            2: Bluffing(bluff_threshold)}
+
+
+# custom strategies by personality, integers from 3 up so personalities
+# lists stay integer arrays in the batch engine
+registry = {}
+
+
+def register(key, strategy):
+    if key in builtin_personalities or key < 0 or key != int(key):
+        raise ValueError('personality %r is built in or not a valid key' %
+                         (key,))
+    registry[key] = strategy
+    return strategy
+
+
+# the strategy of every personality in a game: overrides first, then the
+# built-in ones with the game's thresholds, then the registry
+def resolve_strategies(personalities, overrides=None, naive_threshold=0.5,
+                       bluff_threshold=0.1):
+    builtin = builtin_strategies(naive_threshold, bluff_threshold)
+    resolved = {}
+    for key in set(personalities):
+        if overrides is not None and key in overrides:
+            resolved[key] = overrides[key]
+        elif key in builtin:
+            resolved[key] = builtin[key]
+        elif key in registry:
+            resolved[key] = registry[key]
+        else:
+            raise ValueError('no strategy registered for personality %r' %
+                             (key,))
+    return resolved
+
+
+# actions for a batch of turns where keys[i] is the personality taking turn
+# i: each strategy decides its own turns, then the rules are applied
+# returns (call, bid) arrays
+def decide(strategies, keys, obs):
+    call = np.zeros(obs.size, dtype=bool)
+    bid = np.zeros(obs.size, dtype=np.int64)
+    # in a fixed order, so seeded games draw their numbers the same way
+    for key in sorted(set(keys.tolist())):
+        rows = np.flatnonzero(keys == key)
+        group = obs if rows.size == obs.size else obs.take(rows)
+        (call[rows], bid[rows]) = strategies[key].decide(group)
+
+    # the highest bid possible has to be called, no bid cannot be
+    top = num_bids(obs.total_dice) - 1
+    call |= obs.current_bid == top
+    call &= obs.current_bid >= 0
+    raising = ~call
+    if ((bid[raising] <= obs.current_bid[raising]).any() or
+            (bid[raising] > top[raising]).any()):
+        raise ValueError('a strategy made a raise that is not legal')
+    return call, bid
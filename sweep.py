@@ -0,0 +1,147 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+
+from json_io import read_json, write_json
+from parallel import run_trials
+
+
+# the parameters a sweep grid can vary, and their values when it does not
+# num_players of None takes the number of players from the personality mix
+grid_keys = ('num_players', 'dice_per_player', 'personalities',
+             'naive_threshold', 'bluff_threshold', 'n', 'seed')
+default_grid = {'num_players': [None],
+                'dice_per_player': [5],
+                'personalities': [[0, 1, 2]],
+                'naive_threshold': [0.5],
+                'bluff_threshold': [0.1],
+                'n': [100],
+                'seed': [0]}
+
+
+# expand a grid such as
+#   {'dice_per_player': [3, 5], 'personalities': [[0,1,2], [2,1,0]]}
+# into one config dict per combination of values
+# personality mixes only pair up with games of the same number of players
+def expand_grid(grid):
+    for key in grid:
+        if key not in grid_keys:
+            raise ValueError('unknown sweep parameter: %s' % key)
+    values = [grid.get(key, default_grid[key]) for key in grid_keys]
+
+    configs = []
+    for combo in itertools.product(*values):
+        config = dict(zip(grid_keys, combo))
+        config['personalities'] = list(config['personalities'])
+        if config['num_players'] is None:
+            config['num_players'] = len(config['personalities'])
+        if len(config['personalities']) != config['num_players']:
+            continue
+        configs.append(config)
+    return configs
+
+
+# rough cost of a job: games are about total_dice rounds long and the
+# rational bid search is linear in total_dice
+def job_cost(config):
+    total_dice = config['num_players'] * config['dice_per_player']
+    return config['n'] * total_dice * total_dice
+
+
+# cache file name for a config, the chunk size and engine are part of the
+# key since they decide which random streams the games are played with
+def cache_key(config, chunk_size, batched):
+    key = dict(config)
+    key['chunk_size'] = chunk_size
+    key['batched'] = batched
+    key = json.dumps(key, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(key).hexdigest()
+
+
+def load_cached(cache_dir, key):
+    path = os.path.join(cache_dir, key + '.json')
+    if not os.path.exists(path):
+        return None
+    return read_json(path)
+
+
+# written atomically, so an interrupted sweep never leaves a half-written
+# cell behind
+def save_cached(cache_dir, key, result):
+    write_json(os.path.join(cache_dir, key + '.json'), result)
+    return
+
+
+# play one cell of the sweep, run in the worker processes
+def run_job(task):
+    (config, chunk_size, batched, policy) = task
+    stats = run_trials(config['n'], config['num_players'],
+                       config['dice_per_player'], config['personalities'],
+                       seed=config['seed'], workers=1, chunk_size=chunk_size,
+                       batched=batched,
+                       naive_threshold=config['naive_threshold'],
+                       bluff_threshold=config['bluff_threshold'],
+                       policy=policy)
+    result = {'config': config,
+              'num_games': stats.num_games(),
+              'place_counts': stats.rankings.counts.tolist(),
+              'turns_mean': stats.turns.mean,
+              'turns_var': stats.turns.variance(),
+              'round_length_mean': stats.round_lengths.mean,
+              'round_length_var': stats.round_lengths.variance()}
+    return config, result
+
+
+# run every cell of a grid that is not cached yet, largest jobs first, and
+# return (config, result) pairs in grid order
+# results are cached under cache_dir as soon as each cell finishes, so
+# re-running an edited or interrupted sweep only plays the missing cells
+# policy is the path of a saved policy.PolicyTable as run_trials takes it;
+# it leaves the games as they are, so it is not part of the cache key
+def run_sweep(grid, cache_dir='sweep_cache', workers=None, chunk_size=1000,
+              batched=False, policy=None):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    configs = expand_grid(grid)
+
+    results = {}
+    todo = []
+    for config in configs:
+        key = cache_key(config, chunk_size, batched)
+        if key in results:
+            continue
+        cached = load_cached(cache_dir, key)
+        if cached is None:
+            # mark the cell as scheduled so repeated configs run once
+            results[key] = None
+            todo.append(config)
+        else:
+            results[key] = cached
+
+    # the longest jobs go first so they do not finish alone at the end
+    todo.sort(key=job_cost, reverse=True)
+    tasks = [(config, chunk_size, batched, policy) for config in todo]
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers == 1 or len(tasks) <= 1:
+        finished = (run_job(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        finished = pool.imap_unordered(run_job, tasks)
+
+    try:
+        for (config, result) in finished:
+            key = cache_key(config, chunk_size, batched)
+            save_cached(cache_dir, key, result)
+            results[key] = result
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return [(config, results[cache_key(config, chunk_size, batched)])
+            for config in configs]
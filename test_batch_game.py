@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+
+from batch_game import BatchGame, run_batches
+from simulation_liar import run_games
+
+
+# the batch engine has to play by RunGame's rules: who bids after a player
+# goes out, forced calls on the highest bid and who is recorded as winner
+# all show up in the place distributions and the game lengths, which must
+# agree with run_games up to sampling noise
+def test_matches_run_games():
+    args = (4, 3, [0, 1, 2, 1])
+    n = 3000
+    games = run_games(n, *args, rng=np.random.RandomState(1))
+    batched = run_batches(n, *args, rng=np.random.RandomState(2),
+                          batch_size=1000)
+
+    for player in xrange(4):
+        assert np.abs(games.rankings.probabilities(player) -
+                      batched.rankings.probabilities(player)).max() < 0.05
+    for (a, b) in ((games.turns, batched.turns),
+                   (games.round_lengths, batched.round_lengths)):
+        tolerance = 5 * math.sqrt(a.std_error() ** 2 + b.std_error() ** 2)
+        assert abs(a.mean - b.mean) < tolerance
+
+
+# every game ranks every player once, and its rounds add up to its turns
+def test_rankings_and_rounds():
+    batch = BatchGame(500, 4, 3, [0, 1, 2, 1],
+                      rng=np.random.RandomState(3)).run()
+    assert (np.sort(batch.player_ranking, axis=1) == np.arange(4)).all()
+    assert (batch.round_lengths.sum(axis=1) == batch.cumul_turns).all()
+    # each round but the last costs one die, and the winner keeps at least
+    # one of their 3
+    assert (batch.num_rounds <= 4 * 3 - 1).all()
+
+
+# the thresholds reach the games: naive players who always call never bid
+# after the opening one, so every round is two turns long
+def test_thresholds_passed_through():
+    stats = run_batches(200, 3, 3, [1, 1, 1], rng=np.random.RandomState(4),
+                        naive_threshold=1.0)
+    assert stats.round_lengths.mean == 2.0
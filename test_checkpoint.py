@@ -0,0 +1,34 @@
+import os
+
+from checkpoint import load_checkpoint, run_checkpointed
+
+
+# a run stopped after k games and resumed to n must give the stats of a
+# run of n games that was never stopped
+def check_resume(tmpdir, batched, k, n):
+    args = (3, 3, [0, 1, 2])
+    path = os.path.join(str(tmpdir), 'run.ckpt')
+    run_checkpointed(k, *args, path=path, seed=9, batched=batched,
+                     batch_size=10)
+    assert load_checkpoint(path)[1] == k
+    resumed = run_checkpointed(n, *args, path=path, seed=9, batched=batched,
+                               batch_size=10)
+    straight = run_checkpointed(n, *args, path=path + '.straight', seed=9,
+                                batched=batched, batch_size=10)
+    assert resumed.num_games() == n
+    assert resumed.to_dict() == straight.to_dict()
+
+
+def test_resume(tmpdir):
+    check_resume(tmpdir, batched=False, k=13, n=40)
+
+
+# batched runs checkpoint between batches, so they stop on a batch boundary
+def test_resume_batched(tmpdir):
+    check_resume(tmpdir, batched=True, k=20, n=50)
+
+
+# unless they finish on a partial batch, which is played again in full when
+# the run is extended
+def test_extend_partial_batch(tmpdir):
+    check_resume(tmpdir, batched=True, k=25, n=50)
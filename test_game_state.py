@@ -0,0 +1,52 @@
+import pickle
+
+import numpy as np
+
+from game_state import GameState, play_state
+from simulation_liar import RunGame, play_game
+
+
+# GameState plays by its own copy of RunGame's rules, so seeded games have
+# to come out the same turn for turn
+def test_play_state_matches_play_game():
+    for (num_players, dice_per_player, personalities) in \
+            ((3, 5, [0, 1, 2]), (6, 2, [0, 1, 1, 1, 1, 1]),
+             (4, 3, [2, 2, 0, 1])):
+        rng_game = np.random.RandomState(3)
+        rng_state = np.random.RandomState(3)
+        for i in xrange(30):
+            liars = play_game(num_players, dice_per_player, personalities,
+                              rng=rng_game)
+            state = play_state(num_players, dice_per_player, personalities,
+                               rng=rng_state)
+            assert state.final_ranking() == liars.player_ranking
+            assert state.cumul_turns == liars.cumul_turns
+            rounds = state.round_stats()
+            assert (rounds.count, rounds.mean, rounds.m2) == \
+                (liars.round_stats.count, liars.round_stats.mean,
+                 liars.round_stats.m2)
+        # and draw the same numbers doing it
+        assert rng_game.randint(1 << 30) == rng_state.randint(1 << 30)
+
+
+# a game taken mid-way into a snapshot and played on as a GameState ends
+# as the RunGame does
+def test_branch_from_game():
+    liars = RunGame(4, 3, [0, 1, 2, 1], rng=np.random.RandomState(5))
+    for i in xrange(20):
+        liars.simulate_one_turn()
+    data = GameState.from_game(liars).snapshot()
+    state = pickle.loads(pickle.dumps(GameState.from_snapshot(data)))
+    assert state.snapshot() == data
+
+    rng = np.random.RandomState(6)
+    liars.rng = np.random.RandomState()
+    liars.rng.set_state(rng.get_state())
+    while liars.simulate_one_turn() == 0:
+        pass
+    liars.player_ranking.append(liars.current_player)
+    state.play([0, 1, 2, 1], rng=rng)
+    assert state.final_ranking() == liars.player_ranking
+    assert state.cumul_turns == liars.cumul_turns
+    assert state.num_rounds == liars.round_stats.count
+    assert state.round_mean == liars.round_stats.mean
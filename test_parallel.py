@@ -0,0 +1,26 @@
+import numpy as np
+
+from parallel import run_trials
+
+
+# the chunk seeds and the merge order only depend on seed and chunk_size,
+# so the stats must come out the same whatever the number of workers
+def check_workers_agree(batched):
+    args = (60, 3, 3, [0, 1, 2])
+    serial = run_trials(*args, seed=5, workers=1, chunk_size=7,
+                        batched=batched)
+    pooled = run_trials(*args, seed=5, workers=4, chunk_size=7,
+                        batched=batched)
+    assert serial.num_games() == pooled.num_games() == 60
+    assert np.array_equal(serial.rankings.counts, pooled.rankings.counts)
+    assert serial.turns.mean == pooled.turns.mean
+    assert serial.turns.m2 == pooled.turns.m2
+    assert serial.round_lengths.mean == pooled.round_lengths.mean
+
+
+def test_workers_agree():
+    check_workers_agree(batched=False)
+
+
+def test_workers_agree_batched():
+    check_workers_agree(batched=True)
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+
+from parallel import run_trials
+from policy import PolicyCache, PolicyTable
+from prob_table import get_prob_table
+from simulation_liar import run_games
+
+
+# a table of 3 players with 3 dice each, saved under tmpdir
+def saved_table(tmpdir):
+    path = os.path.join(str(tmpdir), 'policy')
+    PolicyTable.build(get_prob_table(0.333, 9), 9, max_hand=3).save(path)
+    return path
+
+
+# looking the rational decisions up changes how fast the games are played,
+# never how they go, so seeded games come out the same with a policy
+def test_run_games_same_with_policy(tmpdir):
+    args = (200, 3, 3, [0, 1, 2])
+    table = PolicyTable.load(saved_table(tmpdir))
+    policy = PolicyCache(get_prob_table(0.333), table=table)
+    plain = run_games(*args, rng=np.random.RandomState(6))
+    looked_up = run_games(*args, rng=np.random.RandomState(6), policy=policy)
+    assert plain.to_dict() == looked_up.to_dict()
+    assert policy.hits > 0
+
+
+# the workers load the table from its path
+def test_run_trials_same_with_policy(tmpdir):
+    args = (60, 3, 3, [0, 0, 1])
+    plain = run_trials(*args, seed=7, workers=1, chunk_size=20)
+    looked_up = run_trials(*args, seed=7, workers=2, chunk_size=20,
+                           policy=saved_table(tmpdir))
+    assert plain.to_dict() == looked_up.to_dict()
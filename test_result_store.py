@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from parallel import chunk_rng, run_trials
+from result_store import ResultStore
+from simulation_liar import play_game
+
+
+def store_run(tmpdir, name, workers, batched):
+    path = os.path.join(str(tmpdir), name)
+    with ResultStore(path, num_players=3, chunk_size=16) as store:
+        stats = run_trials(50, 3, 3, [0, 1, 2], seed=4, workers=workers,
+                           chunk_size=20, batched=batched, sink=store)
+    return stats, ResultStore(path)
+
+
+# the workers hand their games back, so a pooled run records the same games
+# in the same order as a serial one
+def check_workers_agree(tmpdir, batched):
+    (serial_stats, serial) = store_run(tmpdir, 'serial', 1, batched)
+    (pooled_stats, pooled) = store_run(tmpdir, 'pooled', 3, batched)
+    assert serial_stats.to_dict() == pooled_stats.to_dict()
+    assert pooled.num_records() == 50
+    for (name, dtype) in ResultStore.columns:
+        assert np.array_equal(serial.load_column(name),
+                              pooled.load_column(name))
+    assert (pooled.load_column('seed') == 4).all()
+    assert pooled.load_column('chunk').tolist() == \
+        [0] * 20 + [1] * 20 + [2] * 10
+    assert (pooled.load_column('cumul_turns') > 0).all()
+
+
+def test_workers_agree(tmpdir):
+    check_workers_agree(tmpdir, batched=False)
+
+
+def test_workers_agree_batched(tmpdir):
+    check_workers_agree(tmpdir, batched=True)
+
+
+# seed and chunk are enough to play a recorded game again
+def test_replay_from_chunk(tmpdir):
+    (stats, store) = store_run(tmpdir, 'run', 2, False)
+    rng = chunk_rng(4, 1)
+    liars = play_game(3, 3, [0, 1, 2], rng)
+    assert store.load_column('chunk')[20] == 1
+    assert store.load_column('cumul_turns')[20] == liars.cumul_turns
+    assert store.load_column('player_ranking')[20].tolist() == \
+        liars.player_ranking
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import strategies
+from batch_game import run_batches
+from simulation_liar import run_games
+
+
+# calls every bid straight away, so every round is two turns long
+class Caller:
+    def decide(self, obs):
+        return np.ones(obs.size, dtype=bool), obs.current_bid + 1
+
+
+# raises past the highest bid there is
+class Cheat:
+    def decide(self, obs):
+        return np.zeros(obs.size, dtype=bool), obs.current_bid + 1000
+
+
+def test_register_rejects_builtin_keys():
+    for key in (0, 1, 2, -1, 3.5):
+        with pytest.raises(ValueError):
+            strategies.register(key, Caller())
+
+
+# a registered strategy is picked up by both engines from its key alone
+def test_registered_strategy():
+    strategies.register(3, Caller())
+    try:
+        for stats in (run_games(50, 3, 2, [3, 3, 3],
+                                rng=np.random.RandomState(1)),
+                      run_batches(50, 3, 2, [3, 3, 3],
+                                  rng=np.random.RandomState(1))):
+            assert stats.round_lengths.mean == 2.0
+            # two players lose both dice, the winner up to one of theirs
+            assert 2.0 * 4 <= stats.turns.mean <= 2.0 * 5
+    finally:
+        del strategies.registry[3]
+    with pytest.raises(ValueError):
+        run_games(1, 3, 2, [3, 3, 3])
+
+
+# overriding built-in personalities through the interface gives the same
+# games as the fused code up to sampling noise
+def test_override_builtins():
+    args = (3, 3, [0, 1, 2])
+    overrides = strategies.builtin_strategies()
+    fused = run_batches(2000, *args, rng=np.random.RandomState(2))
+    generic = run_batches(2000, *args, rng=np.random.RandomState(3),
+                          strategies=overrides)
+    for player in xrange(3):
+        assert np.abs(fused.rankings.probabilities(player) -
+                      generic.rankings.probabilities(player)).max() < 0.05
+
+
+def test_illegal_raise():
+    with pytest.raises(ValueError):
+        run_games(1, 3, 2, [0, 1, 2], strategies={0: Cheat(), 1: Cheat(),
+                                                 2: Cheat()})
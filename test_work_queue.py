@@ -0,0 +1,74 @@
+import os
+import time
+
+import numpy as np
+
+import work_queue
+from parallel import run_trials
+
+grid = {'num_players': [3], 'dice_per_player': [3],
+        'personalities': [[0, 1, 2]], 'n': [60], 'seed': [4]}
+
+
+def queue(tmpdir):
+    return os.path.join(str(tmpdir), 'queue')
+
+
+# worker processes sharing a queue give what run_trials gives with the
+# same chunk size, exactly
+def test_run_local_matches_run_trials(tmpdir):
+    [(config, stats)] = work_queue.run_local(queue(tmpdir), grid, workers=3,
+                                             chunk_size=8)
+    expected = run_trials(60, 3, 3, [0, 1, 2], seed=4, workers=1,
+                          chunk_size=8)
+    assert np.array_equal(stats.rankings.counts, expected.rankings.counts)
+    assert stats.turns.mean == expected.turns.mean
+    assert stats.turns.m2 == expected.turns.m2
+    assert work_queue.status(queue(tmpdir))['done'] == 8
+
+
+# backdate a lease as if its holder stopped renewing it seconds ago
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_requeue_expired(tmpdir):
+    q = queue(tmpdir)
+    work_queue.publish(q, grid, chunk_size=30)
+    first = work_queue.claim(q)
+    work_queue.requeue_expired(q, lease_time=60)
+    assert work_queue.shard_names(q, 'leased') == [first]
+    age(work_queue.shard_path(q, 'leased', first), 120)
+    work_queue.requeue_expired(q, lease_time=60)
+    assert work_queue.shard_names(q, 'leased') == []
+    assert first in work_queue.shard_names(q, 'pending')
+    # the requeued shard is claimed again and played with the other one
+    assert work_queue.work(q, lease_time=60, allow_steal=False, poll=0) == 2
+    assert work_queue.status(q)['done'] == 2
+
+
+# only leases held past steal_after are stolen, once each, and a lease with
+# a live copy is not requeued
+def test_steal(tmpdir):
+    q = queue(tmpdir)
+    work_queue.publish(q, grid, chunk_size=30)
+    (first, second) = (work_queue.claim(q), work_queue.claim(q))
+    assert work_queue.steal(q, steal_after=60) is None
+
+    path = work_queue.shard_path(q, 'leased', first)
+    shard = work_queue.read_json(path)
+    shard['claimed'] -= 120
+    work_queue.write_json(path, shard)
+    assert work_queue.steal(q, steal_after=60) == first
+    assert work_queue.steal(q, steal_after=60) is None
+    assert work_queue.status(q)['stolen'] == 1
+
+    age(path, 120)
+    work_queue.requeue_expired(q, lease_time=60)
+    assert work_queue.shard_names(q, 'leased') == [first, second]
+    # until the copy's lease runs out as well
+    age(work_queue.shard_path(q, 'stolen', first), 120)
+    work_queue.requeue_expired(q, lease_time=60)
+    assert work_queue.shard_names(q, 'stolen') == []
+    assert work_queue.shard_names(q, 'pending') == [first]
@@ -0,0 +1,245 @@
+#!/usr/local/bin/python
+
+# compact binary log of every turn, and queries over it
+#
+#   log = TurnLog('turns.bin')
+#   run_games(10000, 6, 5, [2,1,1,1,1,1], recorder=log)
+#   log.close()
+#   python turn_log.py turns.bin
+#
+# the file is an 8 byte magic string followed by fixed-width records of
+# turn_dtype, so it can be memory-mapped as a numpy record array and
+# appended to by later runs
+# bids are stored as ranks (see bids.py) together with the dice on the
+# table they were made with; decoding them is left to the queries
+
+import sys
+
+import numpy as np
+
+from bids import rank_to_bid
+
+
+magic = b'LDTLOG01'
+turn_dtype = np.dtype([('game', '<u4'),
+                       ('turn', '<u2'),
+                       # rounds finished before this turn
+                       ('round', '<u2'),
+                       ('player', 'u1'),
+                       ('personality', 'u1'),
+                       # ACTION_BID or ACTION_CALL
+                       ('action', 'u1'),
+                       # for calls whether the called bid held, -1 for bids
+                       ('bid_true', 'i1'),
+                       # the bid made, or the bid called
+                       ('bid', '<u2'),
+                       ('total_dice', 'u1'),
+                       # dice of the player taking the turn
+                       ('player_dice', 'u1')])
+ACTION_BID = 0
+ACTION_CALL = 1
+
+
+# buffered writer, records go to disk buffer_size at a time
+# records are held as plain tuples until then, appending a tuple costs a
+# fraction of writing one into a record array, and packed all at once
+class TurnLog:
+    def __init__(self, path, buffer_size=65536):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.f = open(path, 'ab')
+        # carry on the game ids of a log that is being appended to
+        self.f.seek(0, 2)
+        if self.f.tell() == 0:
+            self.f.write(magic)
+            self.next_game = 0
+        else:
+            records = read_log(path)
+            self.next_game = int(records['game'][-1]) + 1 if len(records) \
+                else 0
+
+    def add(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+        return
+
+    def flush(self):
+        if self.buffer:
+            self.f.write(np.array(self.buffer, dtype=turn_dtype).tobytes())
+            self.f.flush()
+            # emptied in place, attach holds on to the list
+            del self.buffer[:]
+        return
+
+    def close(self):
+        self.flush()
+        self.f.close()
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # record every turn of a RunGame under the next game id
+    # like instrument.instrument this wraps the game's own methods on the
+    # instance, and keeps per-turn work to a single record write
+    def attach(self, liars):
+        game = self.next_game
+        self.next_game += 1
+        decide_action = liars.decide_action
+        call_on_bid = liars.call_on_bid
+        buffer = self.buffer
+        buffer_size = self.buffer_size
+        round_stats = liars.round_stats
+        # whether the bid called this turn held, -1 when there was no call
+        called = [-1]
+
+        def recorded_call_on_bid():
+            (quantity, face_value) = rank_to_bid(liars.current_bid,
+                                                 liars.total_dice)
+            called[0] = int(liars.matching_dice[face_value - 1] >= quantity)
+            call_on_bid()
+
+        def recorded_decide_action(player_pers):
+            player = liars.current_player
+            total_dice = liars.total_dice
+            player_dice = liars.player_dice[player]
+            called_bid = liars.current_bid
+            called[0] = -1
+            decide_action(player_pers)
+            if called[0] < 0:
+                buffer.append((game, liars.cumul_turns, round_stats.count,
+                               player, player_pers, ACTION_BID, -1,
+                               liars.current_bid, total_dice, player_dice))
+            else:
+                buffer.append((game, liars.cumul_turns, round_stats.count,
+                               player, player_pers, ACTION_CALL, called[0],
+                               called_bid, total_dice, player_dice))
+            if len(buffer) >= buffer_size:
+                self.flush()
+            return
+
+        liars.call_on_bid = recorded_call_on_bid
+        liars.decide_action = recorded_decide_action
+        return liars
+
+
+# the records of a log, memory-mapped read-only
+def read_log(path):
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError('%s is not a turn log' % path)
+    return np.memmap(path, dtype=turn_dtype, mode='r', offset=len(magic))
+
+
+# the records of a log chunk_size at a time, for logs too large to work on
+# in one piece even memory-mapped
+def iter_log(path, chunk_size=1 << 20):
+    records = read_log(path)
+    for start in xrange(0, len(records), chunk_size):
+        yield np.array(records[start:start + chunk_size])
+
+
+#### Queries ####
+# each takes a record array, from read_log or a chunk of iter_log; the
+# counting ones return counts so chunks can be summed
+
+
+# (quantity, face_value) arrays of the bids in records
+def decode_bids(records):
+    return rank_to_bid(records['bid'].astype(np.int64),
+                       records['total_dice'].astype(np.int64))
+
+
+# for every personality, how many bids it made and how many of them were
+# called straight away, as arrays indexed by personality
+def bids_called(records, num_personalities=3):
+    bids = records['action'] == ACTION_BID
+    # the turn after a bid answers it, in the same game
+    answered = np.zeros(len(records), dtype=bool)
+    answered[:-1] = (records['action'][1:] == ACTION_CALL) & \
+        (records['game'][1:] == records['game'][:-1])
+    made = np.bincount(records['personality'][bids],
+                       minlength=num_personalities)
+    called = np.bincount(records['personality'][bids & answered],
+                         minlength=num_personalities)
+    return made, called
+
+
+# for every personality, how many calls it made and how many of them won,
+# which is when the called bid did not hold
+def calls_won(records, num_personalities=3):
+    calls = records['action'] == ACTION_CALL
+    made = np.bincount(records['personality'][calls],
+                       minlength=num_personalities)
+    won = np.bincount(records['personality'][calls &
+                                             (records['bid_true'] == 0)],
+                      minlength=num_personalities)
+    return made, won
+
+
+# counts[round, face_value - 1] of the bids made in each round
+def bid_faces_by_round(records, num_rounds=None):
+    bids = records[records['action'] == ACTION_BID]
+    (quantity, face_value) = decode_bids(bids)
+    rounds = bids['round'].astype(np.int64)
+    if num_rounds is None:
+        num_rounds = int(rounds.max()) + 1 if len(bids) else 0
+    counts = np.zeros((num_rounds, 6), dtype=np.int64)
+    np.add.at(counts, (rounds, face_value - 1), 1)
+    return counts
+
+
+# the counting queries summed over a whole log, a chunk at a time
+def summarize(path, chunk_size=1 << 20):
+    made = called = calls = won = 0
+    faces = np.zeros(6, dtype=np.int64)
+    num_records = 0
+    games = 0
+    last = None
+    for records in iter_log(path, chunk_size):
+        (chunk_made, chunk_called) = bids_called(records)
+        (chunk_calls, chunk_won) = calls_won(records)
+        made = made + chunk_made
+        called = called + chunk_called
+        calls = calls + chunk_calls
+        won = won + chunk_won
+        faces += bid_faces_by_round(records).sum(axis=0)
+        num_records += len(records)
+        # games are logged one after another, so a new game starts
+        # wherever the game id changes
+        games += np.count_nonzero(np.diff(records['game'].astype(np.int64)))
+        first = records[0]
+        if last is None or first['game'] != last['game']:
+            games += 1
+        # a bid at the end of the last chunk answered by a call here
+        elif last['action'] == ACTION_BID and first['action'] == ACTION_CALL:
+            called[last['personality']] += 1
+        last = records[-1]
+    return {'turns': num_records, 'games': games,
+            'bids_made': made, 'bids_called': called,
+            'calls_made': calls, 'calls_won': won, 'bid_faces': faces}
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    summary = summarize(argv[0])
+    print('%d turns in %d games' % (summary['turns'], summary['games']))
+    for (p, name) in enumerate(('rational', 'naive', 'bluffing')):
+        made = summary['bids_made'][p]
+        calls = summary['calls_made'][p]
+        print('%-9s bids %8d  called %5.1f%%  calls %8d  won %5.1f%%' %
+              (name, made, 100.0 * summary['bids_called'][p] / max(made, 1),
+               calls, 100.0 * summary['calls_won'][p] / max(calls, 1)))
+    print('bid faces 1-6: %s' % summary['bid_faces'].tolist())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
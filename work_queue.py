@@ -0,0 +1,368 @@
+#!/usr/local/bin/python
+
+# distributed trials over a shared directory
+#
+#   python work_queue.py publish study.json --queue /shared/q
+#   python work_queue.py work --queue /shared/q        (on every host)
+#   python work_queue.py status --queue /shared/q
+#   python work_queue.py collect --queue /shared/q --out results.json
+#
+# study.json is a sweep grid (see sweep.py); every config in it is split
+# into shards of chunk_size games seeded as in parallel.run_trials, so the
+# merged result of a config is the one run_trials gives with that chunk size
+# the queue directory holds
+#   study.json             the configs, chunk size, engine and policy
+#   pending/<shard>.json   shards nobody holds
+#   leased/<shard>.json    shards a worker is playing, renewed by touching
+#   stolen/<shard>.json    second copies of straggling shards, renewed the
+#                          same way
+#   done/<shard>.json      the GameStats of each finished shard
+# a worker claims a shard by renaming it from pending/ to leased/, which
+# only one worker can win; leases not renewed for lease_time seconds go
+# back to pending/, and a worker with nothing left to claim plays a second
+# copy of a shard that has been leased for steal_after seconds, at most one
+# copy per shard and whichever copy finishes first is kept
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from parallel import run_chunk
+from json_io import read_json, write_json
+from stats import GameStats
+from sweep import expand_grid
+
+
+def shard_name(job, chunk):
+    return 'j%05d-c%07d' % (job, chunk)
+
+
+def shard_names(queue_dir, state):
+    return sorted(name[:-5] for name in
+                  os.listdir(os.path.join(queue_dir, state))
+                  if name.endswith('.json'))
+
+
+def shard_path(queue_dir, state, name):
+    return os.path.join(queue_dir, state, name + '.json')
+
+
+# split every config of a grid into shards and queue them; publishing the
+# same study again only queues the shards that are missing
+# policy is the path of a saved policy.PolicyTable, as run_trials takes it,
+# and has to be readable at that path on every host
+def publish(queue_dir, grid, chunk_size=1000, batched=False, policy=None):
+    configs = expand_grid(grid)
+    shards = []
+    for (job, config) in enumerate(configs):
+        for (chunk, start) in enumerate(xrange(0, config['n'], chunk_size)):
+            shards.append((job, chunk, min(chunk_size, config['n'] - start)))
+    study = {'configs': configs, 'chunk_size': chunk_size,
+             'batched': batched, 'policy': policy,
+             'num_shards': len(shards)}
+
+    for state in ('pending', 'leased', 'stolen', 'done'):
+        if not os.path.isdir(os.path.join(queue_dir, state)):
+            os.makedirs(os.path.join(queue_dir, state))
+    study_path = os.path.join(queue_dir, 'study.json')
+    if os.path.exists(study_path):
+        if read_json(study_path) != study:
+            raise ValueError('%s holds another study' % queue_dir)
+    else:
+        write_json(study_path, study)
+
+    for (job, chunk, size) in shards:
+        name = shard_name(job, chunk)
+        if any(os.path.exists(shard_path(queue_dir, state, name))
+               for state in ('pending', 'leased', 'done')):
+            continue
+        write_json(shard_path(queue_dir, 'pending', name),
+                   {'job': job, 'chunk': chunk, 'size': size})
+    return study
+
+
+# take a pending shard, None when there is none left to take
+# the lease records when it was claimed, touching it only shows that its
+# holder is alive
+def claim(queue_dir):
+    for name in shard_names(queue_dir, 'pending'):
+        path = shard_path(queue_dir, 'leased', name)
+        try:
+            # the lease starts now, not when the shard was published
+            os.utime(shard_path(queue_dir, 'pending', name), None)
+            os.rename(shard_path(queue_dir, 'pending', name), path)
+        except OSError:
+            # another worker got there first
+            continue
+        try:
+            shard = read_json(path)
+            shard['claimed'] = time.time()
+            write_json(path, shard)
+        except (IOError, OSError):
+            # requeued already, the shard is someone else's now
+            continue
+        return name
+    return None
+
+
+# start a second copy of a shard leased more than steal_after seconds ago
+# that has no copy yet, None when there is none
+def steal(queue_dir, steal_after):
+    now = time.time()
+    for name in shard_names(queue_dir, 'leased'):
+        if os.path.exists(shard_path(queue_dir, 'stolen', name)) or \
+                os.path.exists(shard_path(queue_dir, 'done', name)):
+            continue
+        try:
+            shard = read_json(shard_path(queue_dir, 'leased', name))
+        except (IOError, ValueError):
+            continue
+        # a lease that is still being written down counts as new
+        if now - shard.get('claimed', now) < steal_after:
+            continue
+        # creating the copy's lease only works for one worker
+        try:
+            fd = os.open(shard_path(queue_dir, 'stolen', name),
+                         os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError:
+            continue
+        with os.fdopen(fd, 'w') as f:
+            json.dump(shard, f)
+        return name
+    return None
+
+
+# put shards whose lease ran out back in pending/, unless a copy of them is
+# still being played, and clear leases of shards that are done
+def requeue_expired(queue_dir, lease_time):
+    now = time.time()
+    for name in shard_names(queue_dir, 'stolen'):
+        path = shard_path(queue_dir, 'stolen', name)
+        try:
+            if os.path.exists(shard_path(queue_dir, 'done', name)) or \
+                    os.path.getmtime(path) < now - lease_time:
+                os.remove(path)
+        except OSError:
+            continue
+    for name in shard_names(queue_dir, 'leased'):
+        path = shard_path(queue_dir, 'leased', name)
+        try:
+            if os.path.exists(shard_path(queue_dir, 'done', name)):
+                os.remove(path)
+            elif os.path.getmtime(path) < now - lease_time and \
+                    not os.path.exists(shard_path(queue_dir, 'stolen', name)):
+                os.rename(path, shard_path(queue_dir, 'pending', name))
+        except OSError:
+            continue
+    return
+
+
+# keeps a lease alive by touching it every interval seconds while the
+# shard is being played
+class Heartbeat:
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.path, None)
+            except OSError:
+                # the lease was requeued or cleared under us
+                return
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return
+
+
+# play one shard and record its stats, unless another copy got there first,
+# then drop the lease it was played under, state being leased or stolen
+def play_shard(queue_dir, study, name, shard, state='leased'):
+    config = study['configs'][shard['job']]
+    stats = run_chunk((config['seed'], shard['chunk'], shard['size'],
+                       config['num_players'], config['dice_per_player'],
+                       config['personalities'], study['batched'],
+                       config['naive_threshold'], config['bluff_threshold'],
+                       study['policy']))
+    done_path = shard_path(queue_dir, 'done', name)
+    if not os.path.exists(done_path):
+        result = stats.to_dict()
+        result['job'] = shard['job']
+        result['chunk'] = shard['chunk']
+        write_json(done_path, result)
+    try:
+        os.remove(shard_path(queue_dir, state, name))
+    except OSError:
+        pass
+    return
+
+
+# play shards until every shard of the study is done, returns the number
+# of shards this worker played
+# with allow_steal set, a worker that finds nothing to claim plays a copy
+# of a shard another worker has held for steal_after seconds, lease_time
+# by default, rather than wait for it
+def work(queue_dir, lease_time=60.0, allow_steal=True, poll=1.0,
+         steal_after=None):
+    if steal_after is None:
+        steal_after = lease_time
+    study = read_json(os.path.join(queue_dir, 'study.json'))
+    played = 0
+    while True:
+        requeue_expired(queue_dir, lease_time)
+        name = claim(queue_dir)
+        state = 'leased'
+        if name is None:
+            if len(shard_names(queue_dir, 'done')) >= study['num_shards']:
+                return played
+            if allow_steal:
+                name = steal(queue_dir, steal_after)
+                state = 'stolen'
+            if name is None:
+                time.sleep(poll)
+                continue
+
+        try:
+            shard = read_json(shard_path(queue_dir, state, name))
+        except (IOError, ValueError):
+            # the lease was requeued or cleared in the meantime
+            continue
+        heartbeat = Heartbeat(shard_path(queue_dir, state, name),
+                              lease_time / 3.0)
+        try:
+            play_shard(queue_dir, study, name, shard, state)
+        finally:
+            heartbeat.stop()
+        played += 1
+
+
+# shard counts per state, stolen counting the second copies in play
+def status(queue_dir):
+    study = read_json(os.path.join(queue_dir, 'study.json'))
+    counts = dict((state, len(shard_names(queue_dir, state)))
+                  for state in ('pending', 'leased', 'stolen', 'done'))
+    counts['total'] = study['num_shards']
+    return counts
+
+
+# merge the shards of every config in chunk order, the ranking counts are
+# integers so the histograms come out exact; returns (config, GameStats)
+# pairs in the order of the study
+def collect(queue_dir):
+    study = read_json(os.path.join(queue_dir, 'study.json'))
+    done = shard_names(queue_dir, 'done')
+    if len(done) < study['num_shards']:
+        raise ValueError('%d of %d shards are done' %
+                         (len(done), study['num_shards']))
+    results = [GameStats(config['num_players'])
+               for config in study['configs']]
+    # shard names sort by job and then chunk
+    for name in done:
+        result = read_json(shard_path(queue_dir, 'done', name))
+        results[result['job']].merge(GameStats.from_dict(result))
+    return zip(study['configs'], results)
+
+
+# publish a study and work it with local worker processes standing in for
+# hosts, returns what collect does
+def run_local(queue_dir, grid, workers=None, chunk_size=1000, batched=False,
+              lease_time=60.0, policy=None):
+    publish(queue_dir, grid, chunk_size, batched, policy)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    processes = [multiprocessing.Process(target=work,
+                                         args=(queue_dir, lease_time))
+                 for i in xrange(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return collect(queue_dir)
+
+
+#### Distributed versions of the simulation drivers ####
+def simulate_one_vs_many_distributed(queue_dir, n, num_players,
+                                     dice_per_player, personalities, seed=0,
+                                     workers=None, chunk_size=1000,
+                                     batched=False, policy=None):
+    grid = {'num_players': [num_players],
+            'dice_per_player': [dice_per_player],
+            'personalities': [personalities], 'n': [n], 'seed': [seed]}
+    [(config, stats)] = run_local(queue_dir, grid, workers, chunk_size,
+                                  batched, policy=policy)
+    return stats.rankings.ranking_dict(0)
+
+
+def simulate_mixed_distributed(queue_dir, n, num_players, dice_per_player,
+                               personalities, seed=0, workers=None,
+                               chunk_size=1000, batched=False, policy=None):
+    grid = {'num_players': [num_players],
+            'dice_per_player': [dice_per_player],
+            'personalities': [personalities], 'n': [n], 'seed': [seed]}
+    [(config, stats)] = run_local(queue_dir, grid, workers, chunk_size,
+                                  batched, policy=policy)
+    return [stats.rankings.ranking_dict(player)
+            for player in xrange(num_players)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Liar\'s dice work queue')
+    commands = parser.add_subparsers(dest='command')
+
+    publish_cmd = commands.add_parser('publish', help='queue a study')
+    publish_cmd.add_argument('grid', help='JSON file with a sweep grid')
+    publish_cmd.add_argument('--chunk-size', type=int, default=1000)
+    publish_cmd.add_argument('--batched', action='store_true')
+    publish_cmd.add_argument('--policy',
+                             help='saved policy table to look rational '
+                                  'decisions up in, on the same path on '
+                                  'every host')
+
+    work_cmd = commands.add_parser('work', help='play shards until done')
+    work_cmd.add_argument('--lease-time', type=float, default=60.0)
+    work_cmd.add_argument('--no-steal', action='store_true')
+    work_cmd.add_argument('--steal-after', type=float,
+                          help='seconds a shard is held before a copy of '
+                               'it is played, the lease time by default')
+
+    commands.add_parser('status', help='count shards per state')
+
+    collect_cmd = commands.add_parser('collect', help='merge the results')
+    collect_cmd.add_argument('--out', default='results.json')
+
+    for command in commands.choices.values():
+        command.add_argument('--queue', required=True,
+                             help='shared queue directory')
+    args = parser.parse_args(argv)
+
+    if args.command == 'publish':
+        study = publish(args.queue, read_json(args.grid), args.chunk_size,
+                        args.batched, args.policy)
+        print('%d shards queued' % study['num_shards'])
+    elif args.command == 'work':
+        played = work(args.queue, args.lease_time, not args.no_steal,
+                      steal_after=args.steal_after)
+        print('%d shards played' % played)
+    elif args.command == 'status':
+        print(json.dumps(status(args.queue), sort_keys=True))
+    else:
+        results = [dict(config, **stats.to_dict())
+                   for (config, stats) in collect(args.queue)]
+        with open(args.out, 'w') as f:
+            json.dump(results, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())